@@ -0,0 +1,108 @@
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from ..src.buhlmann import zh_l16c
+from ..src.dive_evaluation import DiveEvaluation
+from ..src.dive_plan import DivePlan
+from ..src.gas_profile import GasSupply, GasSupplyProfile, GasSupplySet
+from ..src.gear import Cylinder
+from ..src.physics import AIR, Gas
+from ..src.quantity import Pressure, Time, Volume
+
+# (rows, dive length in min, sample period in s)
+CASES = [
+    (10, 60, 10),
+    (50, 180, 10),
+    (50, 180, 1),
+    (200, 360, 1),
+]
+
+
+def generate_plan(rows: int, duration_min: float, seed: int = 0) -> DivePlan:
+    # descent, a multilevel bottom part on main gas and a shallow part on deco gas
+    rng = random.Random(seed)
+    main = GasSupply(Cylinder(Volume(24e-3)), AIR, Pressure(300e5))
+    deco = GasSupply(Cylinder(Volume(11e-3)), Gas(o2=0.5, he=0), Pressure(200e5))
+    start_gas_supply_set = GasSupplySet(main=main, deco=deco)
+    # whole minutes keep the row times on the sample grid of every case
+    row_duration_min = max(1, round(duration_min/(rows - 1)))
+    table = [(0, 0, 'main', 20)]
+    for row in range(1, rows - 1):
+        if row < 2*rows//3:
+            table.append((rng.randint(20, 45), row_duration_min, 'main', 20))
+        else:
+            table.append((rng.randint(3, 21), row_duration_min, 'deco', 15))
+    table.append((0, row_duration_min, 'deco', 15))
+    return DivePlan.from_table(start_gas_supply_set, table)
+
+
+def measure(function, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_case(rows: int, duration_min: float, sample_period_s: float, repeat: int) -> dict:
+    algorithm = zh_l16c(gf_low=0.3, gf_high=0.8)
+    plan = generate_plan(rows, duration_min)
+    dive = plan.dive
+    resampled = dive.resample(Time(sample_period_s))
+    profiles = algorithm.compartiment_profiles(
+        depth_profile=resampled.depth_profile, gas_usage_profile=resampled.gas_usage_profile, gas_supply_set=plan.start_gas_supply_set,
+    )
+    stages = {
+        'DivePlan.dive': lambda: generate_plan(rows, duration_min).dive,
+        'Dive.resample': lambda: dive.resample(Time(sample_period_s)),
+        'GasSupplyProfile.create': lambda: GasSupplyProfile.create(
+            start_gas_supply_set=plan.start_gas_supply_set, depth_profile=resampled.depth_profile, gas_usage_profile=resampled.gas_usage_profile,
+        ),
+        'Buhlmann.compartiment_profiles': lambda: algorithm.compartiment_profiles(
+            depth_profile=resampled.depth_profile, gas_usage_profile=resampled.gas_usage_profile, gas_supply_set=plan.start_gas_supply_set,
+        ),
+        'pressure_gf_low': lambda: algorithm.table.pressure_gf_low(profiles.n2_pressures.T, profiles.ambient_pressures, algorithm.gf_low),
+        'ceiling_profile': lambda: profiles.ceiling_profile(),
+        'DiveEvaluation.create': lambda: DiveEvaluation.create(algorithm, dive, Time(sample_period_s)).ceiling,
+    }
+    return {
+        'rows': rows,
+        'duration_min': duration_min,
+        'sample_period_s': sample_period_s,
+        'samples': len(resampled.timeline),
+        'stages': {name: measure(stage, repeat) for name, stage in stages.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the planning, resampling and deco hot paths.")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per stage, the fastest is reported")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cases': [run_case(rows, duration_min, sample_period_s, args.repeat) for rows, duration_min, sample_period_s in CASES],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -47,9 +47,14 @@ m = {f"Compartiment {i+1}": [state.m_value.value for state in deco[f"Compartimen
 aps = [pressure_from_depth(dive.depth_profile[t]).value for t in dive.timeline]
 mgf = {f"Compartiment {i+1}": [state.mgf_value(deco.gf_low, deco.gf_high, deco.pressure_gf_low).value for state in deco[f"Compartiment {i+1}"].states] for i in range(8)}
 
+# Generated ascent for the bottom part of the plan
+schedule = algorithm.schedule(DivePlan.from_table(start_gas_supply_set=start_gas_supply_set, table=tec40_4[:5]))
+
+
 # Printing and plotting
 for time, gas_supply_set in dive.gas_supply_profile.gas_supply_sets.items():
     print(f"{time}: {gas_supply_set}")
+print(f"generated stops: {schedule}")
 
 MPLProfilePlot(dive, deco).show()
 
@@ -1,10 +1,17 @@
 
-from functools import cache, cached_property
+from collections.abc import Iterator
+from functools import cached_property, lru_cache
+import math
 from typing import Self
+
+import numpy as np
+
 from .depth_profile import DepthProfile
+from .dive import Dive
+from .dive_plan import DivePlan, DivePlanRow
 from .gas_profile import GasSupplySet, GasUsageProfile
-from .physics import AIR, P_ALV_H2O, P_ATM, Gas, pressure_from_depth
-from .quantity import Pressure, Time
+from .physics import AIR, P_ALV_H2O, P_ATM, PPN2_ATM, Gas, depth_from_pressure, pressure_from_depth
+from .quantity import T0, Depth, Pressure, Time
 
 
 class BMCompartiment:
@@ -14,20 +21,38 @@ class BMCompartiment:
         self.a = a
         self.b = b
 
-    @cache
     def agf(self, gf_low: float, gf_high: float, pressure_gf_low: Pressure) -> Pressure:
-        return sum([
-            (pressure_gf_low*gf_high - P_ATM*gf_low)/(pressure_gf_low - P_ATM)*self.a,
-            pressure_gf_low*P_ATM/(pressure_gf_low - P_ATM)*(gf_high - gf_low)*(1-self.b)/self.b,
-        ])
+        agf, _ = gf_coefficients((self.a.value,), (self.b,), gf_low, gf_high, pressure_gf_low.value)
+        return Pressure(float(agf[0]))
 
-    @cache
     def bgf(self, gf_low: float, gf_high: float, pressure_gf_low: Pressure) -> float:
-        return 1/sum([
-            1,
-            (gf_low - gf_high)/(pressure_gf_low - P_ATM)*self.a,
-            (pressure_gf_low*gf_low - P_ATM*gf_high)/(pressure_gf_low - P_ATM)*(1-self.b)/self.b,
-        ])
+        _, bgf = gf_coefficients((self.a.value,), (self.b,), gf_low, gf_high, pressure_gf_low.value)
+        return float(bgf[0])
+
+
+GF_COEFFICIENTS_CACHE_SIZE = 1024
+SCAN_BLOCK_DECAY = 20 # largest exponent of the tissue decay within one block of BMCompartimentTable._scan
+MAX_DECO_PPO2 = Pressure(1.6e5)
+
+
+@lru_cache(maxsize=GF_COEFFICIENTS_CACHE_SIZE)
+def gf_coefficients(a: tuple[float, ...], b: tuple[float, ...], gf_low: float, gf_high: float, pressure_gf_low: float) -> tuple[np.ndarray, np.ndarray]:
+    # agf and bgf of the gradient factor line through gf_low at pressure_gf_low and gf_high at the surface
+    a = np.array(a)
+    b = np.array(b)
+    p_atm = P_ATM.value
+    span = pressure_gf_low - p_atm
+    b_term = (1 - b)/b
+    agf = (pressure_gf_low*gf_high - p_atm*gf_low)/span*a + pressure_gf_low*p_atm/span*(gf_high - gf_low)*b_term
+    bgf = 1/(1 + (gf_low - gf_high)/span*a + (pressure_gf_low*gf_low - p_atm*gf_high)/span*b_term)
+    agf.flags.writeable = False
+    bgf.flags.writeable = False
+    return agf, bgf
+
+
+def n2_pressure_values(n2_pressure: Pressure | np.ndarray) -> float | np.ndarray:
+    # one n2 pressure for all compartiments, or an array of per-compartiment n2 pressures in Pa
+    return n2_pressure.value if isinstance(n2_pressure, Pressure) else np.asarray(n2_pressure, dtype=float)
 
 
 class BMCompartimentState:
@@ -59,80 +84,571 @@ class BMCompartimentState:
         return self.compartiment.agf(gf_low=gf_low, gf_high=gf_high, pressure_gf_low=pressure_gf_low) + self.ambient_pressure/self.compartiment.bgf(gf_low=gf_low, gf_high=gf_high, pressure_gf_low=pressure_gf_low)
         # return self.ambient_pressure + self.m_gradient*self.gradient_factor_limit(gf_low=gf_low, gf_high=gf_high, pressure_gf_low=pressure_gf_low)
 
-    def next(self, duration: Time, ambient_pressure: Pressure, gas: Gas) -> Self:
+    def next(self, duration: Time, ambient_pressure: Pressure, gas: Gas, exact: bool = False) -> Self:
+        if exact:
+            return self._next_schreiner(duration=duration, ambient_pressure=ambient_pressure, gas=gas)
         if duration > Time(10):
             raise NotImplementedError("Algorithm might not be accurate for timesteps lager than 10s. Who knows?")
         average_ambient_pressure = (self.ambient_pressure + ambient_pressure)/2
         n2_pressure = self.n2_pressure + (gas.ppn2(average_ambient_pressure - P_ALV_H2O) - self.n2_pressure)*(1 - 2**(-duration/self.compartiment.halftime))
         return BMCompartimentState(compartiment=self.compartiment, ambient_pressure=ambient_pressure, n2_pressure=n2_pressure)
 
+    def _next_schreiner(self, duration: Time, ambient_pressure: Pressure, gas: Gas) -> Self:
+        # Schreiner equation: exact for a linear change of ambient pressure over the segment
+        if duration.value == 0:
+            return BMCompartimentState(compartiment=self.compartiment, ambient_pressure=ambient_pressure, n2_pressure=self.n2_pressure)
+        k = math.log(2)/self.compartiment.halftime
+        decay = 1 - math.exp(-k*duration)
+        inspired_n2_pressure = gas.ppn2(self.ambient_pressure - P_ALV_H2O)
+        n2_pressure_change = gas.ppn2(ambient_pressure - self.ambient_pressure)
+        n2_pressure = self.n2_pressure + (inspired_n2_pressure - self.n2_pressure)*decay + n2_pressure_change*(1 - decay/(k*duration))
+        return BMCompartimentState(compartiment=self.compartiment, ambient_pressure=ambient_pressure, n2_pressure=n2_pressure)
+
+
+class BMCompartimentTable:
+    def __init__(self, compartiments: list[BMCompartiment]):
+        self.compartiments = compartiments
+        self.halftimes = np.array([compartiment.halftime.value for compartiment in compartiments])
+        self.a = np.array([compartiment.a.value for compartiment in compartiments])
+        self.b = np.array([compartiment.b for compartiment in compartiments])
+
+    def __len__(self):
+        return len(self.compartiments)
+
+    @cached_property
+    def k(self) -> np.ndarray:
+        return np.log(2)/self.halftimes
+
+    def advance(self, n2_pressures: np.ndarray, duration: float, start_ambient_pressure: float, stop_ambient_pressure: float, n2_fraction: float) -> np.ndarray:
+        # Schreiner equation for a single segment, applied to all compartiments. Durations and pressures may also
+        # be arrays broadcasting against n2_pressures (e.g. one row per dive), the durations must then be positive.
+        if np.ndim(duration) == 0 and duration == 0:
+            return n2_pressures
+        decays = -np.expm1(-self.k*duration)
+        inspired_n2_pressure = n2_fraction*(start_ambient_pressure - P_ALV_H2O.value)
+        n2_pressure_change = n2_fraction*(stop_ambient_pressure - start_ambient_pressure)
+        return n2_pressures + (inspired_n2_pressure - n2_pressures)*decays + n2_pressure_change*(1 - decays/(self.k*duration))
+
+    def tolerated_pressures(self, ambient_pressure: float, gf: float) -> np.ndarray:
+        return ambient_pressure + gf*(self.a + ambient_pressure/self.b - ambient_pressure)
+
+    def constant_gf_coefficients(self, gf: float) -> tuple[np.ndarray, np.ndarray]:
+        # agf and bgf of an M-value line scaled by a single gradient factor
+        return gf*self.a, 1/(1 + gf/self.b - gf)
+
+    def ceiling_pressures(self, n2_pressures: np.ndarray, agf: np.ndarray, bgf: np.ndarray) -> np.ndarray:
+        # lowest tolerated ambient pressure per compartiment, n2_pressures have compartiments along the last axis
+        return (n2_pressures - agf)*bgf
+
+    def gf_ceiling_pressures(self, n2_pressures: np.ndarray, gf_low: float, gf_high: float, pressure_gf_low: float) -> np.ndarray:
+        # gf_low applies below pressure_gf_low, the gradient factor line above it
+        low_ceiling_pressures = self.ceiling_pressures(n2_pressures, *self.constant_gf_coefficients(gf_low))
+        line_ceiling_pressures = self.ceiling_pressures(n2_pressures, *self.gf_coefficients(gf_low, gf_high, pressure_gf_low))
+        return np.where(low_ceiling_pressures >= pressure_gf_low, low_ceiling_pressures, line_ceiling_pressures)
+
+    def gf_coefficients(self, gf_low: float, gf_high: float, pressure_gf_low: float) -> tuple[np.ndarray, np.ndarray]:
+        return gf_coefficients(tuple(self.a.tolist()), tuple(self.b.tolist()), float(gf_low), float(gf_high), float(pressure_gf_low))
+
+    def load(self,
+            start_n2_pressures: np.ndarray, durations: np.ndarray, ambient_pressures: np.ndarray, n2_fractions: np.ndarray,
+            exact: bool = False, gf_low: float | None = None,
+        ) -> tuple[np.ndarray, float | None]:
+        # n2 pressures of all compartiments (rows) at every timestep (columns),
+        # plus the highest ambient pressure at which a compartiment exceeded gf_low
+        if exact:
+            decays, inspired_n2_pressures, ramp_offsets = self._schreiner_terms(durations, ambient_pressures, n2_fractions)
+        else:
+            decays, inspired_n2_pressures, ramp_offsets = self._haldane_terms(durations, ambient_pressures, n2_fractions)
+        decays = decays.T
+        offsets = inspired_n2_pressures[:, np.newaxis]*decays + ramp_offsets.T
+        n2_pressures = self._scan(np.broadcast_to(start_n2_pressures, len(self)), decays, offsets, durations)
+        pressure_gf_low = self.pressure_gf_low(n2_pressures, ambient_pressures, gf_low) if gf_low is not None else None
+        return n2_pressures.T, pressure_gf_low
+
+    def pressure_gf_low(self, n2_pressures: np.ndarray, ambient_pressures: np.ndarray, gf_low: float) -> float | None:
+        # highest ambient pressure at which a compartiment exceeds gf_low, n2_pressures have timesteps as rows.
+        # Surface samples are left out, a gradient factor line cannot be anchored at the surface.
+        exceeded = (n2_pressures > self.tolerated_pressures(ambient_pressures[:, np.newaxis], gf_low)).any(axis=-1) & (ambient_pressures > P_ATM.value)
+        return float(ambient_pressures[exceeded].max()) if exceeded.any() else None
+
+    def _scan(self, start_n2_pressures: np.ndarray, decays: np.ndarray, offsets: np.ndarray, durations: np.ndarray) -> np.ndarray:
+        # Solves n2[t] = n2[t-1]*(1 - decays[t-1]) + offsets[t-1] along the first axis. Within a block the
+        # recurrence is n2[t] = Q[t]*(n2[first] + sum(offsets[i]/Q[i])) with Q the running product of 1 - decays, so
+        # it takes cumulative products and sums instead of a Python step per timestep. Blocks end before Q drops
+        # below exp(-SCAN_BLOCK_DECAY), which keeps the division well conditioned, and a step decaying faster
+        # than that opens its own block.
+        retentions = 1 - decays
+        n2_pressures = np.empty((len(decays) + 1,) + retentions.shape[1:])
+        n2_pressures[0] = start_n2_pressures
+        if not len(decays):
+            return n2_pressures
+        block_decays = np.cumsum(self.k.max()*np.max(durations.reshape(len(durations), -1), axis=-1, initial=0))
+        starts = np.flatnonzero(np.diff(np.floor(block_decays/SCAN_BLOCK_DECAY), prepend=-1))
+        for first, stop in zip(starts.tolist(), starts[1:].tolist() + [len(decays)]):
+            n2_pressures[first + 1] = n2_pressures[first]*retentions[first] + offsets[first]
+            if stop - first > 1:
+                products = np.cumprod(retentions[first + 1:stop], axis=0)
+                n2_pressures[first + 2:stop + 1] = products*(n2_pressures[first + 1] + np.cumsum(offsets[first + 1:stop]/products, axis=0))
+        return n2_pressures
+
+    def load_batch(self,
+            start_n2_pressures: np.ndarray, durations: np.ndarray, ambient_pressures: np.ndarray, n2_fractions: np.ndarray,
+            exact: bool = False, gf_low: float | None = None,
+        ) -> tuple[np.ndarray, np.ndarray]:
+        # load() for several dives at once: start_n2_pressures are (dives x compartiments), the other arrays have dives
+        # as rows and timesteps as columns. Shorter dives are padded with zero durations at their last ambient pressure.
+        # Returns the (dives x compartiments x timesteps) n2 pressures and pressure_gf_low per dive, nan where not exceeded.
+        terms = self._schreiner_terms if exact else self._haldane_terms
+        decays, inspired_n2_pressures, ramp_offsets = terms(
+            durations[:, np.newaxis], ambient_pressures[:, np.newaxis], n2_fractions[:, np.newaxis],
+        )
+        decays = np.ascontiguousarray(decays.transpose(2, 0, 1))
+        offsets = inspired_n2_pressures.transpose(2, 0, 1)*decays + ramp_offsets.transpose(2, 0, 1)
+        ambient_pressures = np.ascontiguousarray(ambient_pressures.T)
+        n2_pressures = self._scan(start_n2_pressures, decays, offsets, durations.T)
+        pressures_gf_low = np.full(ambient_pressures.shape[1], np.nan)
+        if gf_low is not None:
+            exceeded = (n2_pressures > self.tolerated_pressures(ambient_pressures[:, :, np.newaxis], gf_low)).any(axis=-1) & (ambient_pressures > P_ATM.value)
+            exceeded_pressures = np.where(exceeded, ambient_pressures, -np.inf).max(axis=0)
+            pressures_gf_low = np.where(np.isfinite(exceeded_pressures), exceeded_pressures, np.nan)
+        return n2_pressures.transpose(1, 2, 0), pressures_gf_low
+
+    def _haldane_terms(self, durations: np.ndarray, ambient_pressures: np.ndarray, n2_fractions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if np.any(durations > Time(10).value):
+            raise NotImplementedError("Algorithm might not be accurate for timesteps lager than 10s. Who knows?")
+        average_ambient_pressures = (ambient_pressures[..., :-1] + ambient_pressures[..., 1:])/2
+        inspired_n2_pressures = n2_fractions*(average_ambient_pressures - P_ALV_H2O.value)
+        rates = 1 - 2**(-durations/self.halftimes[:, np.newaxis])
+        return rates, inspired_n2_pressures, np.zeros_like(rates)
+
+    def _schreiner_terms(self, durations: np.ndarray, ambient_pressures: np.ndarray, n2_fractions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Schreiner equation: exact for constant depth and linear ramp segments of any duration
+        k = self.k[:, np.newaxis]
+        decays = -np.expm1(-k*durations)
+        inspired_n2_pressures = n2_fractions*(ambient_pressures[..., :-1] - P_ALV_H2O.value)
+        n2_pressure_changes = n2_fractions*np.diff(ambient_pressures, axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ramp_terms = np.where(durations > 0, 1 - decays/(k*durations), 0)
+        return decays, inspired_n2_pressures, n2_pressure_changes*ramp_terms
+
+
+class BMCompartimentStates:
+    # sequence of BMCompartimentState views, created on access from the profile arrays
+    def __init__(self, profile: 'BMCompartimentProfile'):
+        self.profile = profile
+
+    def __len__(self) -> int:
+        return len(self.profile.n2_pressures)
+
+    def __getitem__(self, index: int | slice) -> BMCompartimentState | list[BMCompartimentState]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return BMCompartimentState(
+            compartiment=self.profile.compartiment,
+            ambient_pressure=Pressure(float(self.profile.ambient_pressures[index])),
+            n2_pressure=Pressure(float(self.profile.n2_pressures[index])),
+        )
+
+    def __iter__(self) -> Iterator[BMCompartimentState]:
+        for ambient_pressure, n2_pressure in zip(self.profile.ambient_pressures.tolist(), self.profile.n2_pressures.tolist()):
+            yield BMCompartimentState(compartiment=self.profile.compartiment, ambient_pressure=Pressure(ambient_pressure), n2_pressure=Pressure(n2_pressure))
+
 
 class BMCompartimentProfile:
-    def __init__(self, states: list[BMCompartimentState]):
-        self.states = states
+    def __init__(self, compartiment: BMCompartiment, ambient_pressures: np.ndarray, n2_pressures: np.ndarray):
+        self.compartiment = compartiment
+        self.ambient_pressures = ambient_pressures
+        self.n2_pressures = n2_pressures
 
-    @staticmethod
-    def create(
-            compartiment: BMCompartiment,
-            depth_profile: DepthProfile, gas_usage_profile: GasUsageProfile,
-            gas_supply_set: GasSupplySet, start_ambient_pressure: Pressure, start_n2_pressure: Pressure
-        ) -> Self:
-        states = [BMCompartimentState(compartiment=compartiment, ambient_pressure=start_ambient_pressure, n2_pressure=start_n2_pressure)]
-        for segment in depth_profile.timeline.segments:
-            duration = segment.duration
-            ambient_pressure = pressure_from_depth(depth_profile[segment.stop])
-            gas = gas_supply_set[gas_usage_profile[segment.start].gas_supply_name].gas
-            states.append(states[-1].next(duration=duration, ambient_pressure=ambient_pressure, gas=gas))
-        return BMCompartimentProfile(states)
+    @property
+    def states(self) -> BMCompartimentStates:
+        return BMCompartimentStates(self)
+
+    @property
+    def m_values(self) -> np.ndarray:
+        return self.compartiment.a.value + self.ambient_pressures/self.compartiment.b
+
+    @property
+    def gradients(self) -> np.ndarray:
+        return self.n2_pressures - self.ambient_pressures
+
+    @property
+    def m_gradients(self) -> np.ndarray:
+        return self.m_values - self.ambient_pressures
+
+    @property
+    def gradient_factors(self) -> np.ndarray:
+        return self.gradients/self.m_gradients
+
+    def mgf_values(self, gf_low: float, gf_high: float, pressure_gf_low: Pressure) -> np.ndarray:
+        agf = self.compartiment.agf(gf_low=gf_low, gf_high=gf_high, pressure_gf_low=pressure_gf_low)
+        bgf = self.compartiment.bgf(gf_low=gf_low, gf_high=gf_high, pressure_gf_low=pressure_gf_low)
+        return agf.value + self.ambient_pressures/bgf
     
 
+class BMTissueCheckpoint:
+    # tissue state at a single moment, e.g. the end of a dive
+    def __init__(self, ambient_pressure: float, n2_pressures: np.ndarray):
+        self.ambient_pressure = ambient_pressure
+        self.n2_pressures = n2_pressures
+
+    @property
+    def start_ambient_pressure(self) -> Pressure:
+        return Pressure(self.ambient_pressure)
+
+    @property
+    def start_n2_pressure(self) -> np.ndarray:
+        # per-compartiment n2 pressures in Pa, accepted wherever a start_n2_pressure is
+        return self.n2_pressures
+
+    def to_bytes(self) -> bytes:
+        return np.concatenate(([self.ambient_pressure], self.n2_pressures)).astype('<f8').tobytes()
+
+    @staticmethod
+    def from_bytes(data: bytes) -> Self:
+        values = np.frombuffer(data, dtype='<f8')
+        return BMTissueCheckpoint(ambient_pressure=float(values[0]), n2_pressures=values[1:].copy())
+
+    def surface_interval(self, table: BMCompartimentTable, duration: Time, gas: Gas = AIR) -> Self:
+        # constant surface pressure, so the Schreiner equation reduces to a single exponential per compartiment
+        n2_pressures = table.advance(self.n2_pressures, duration.value, P_ATM.value, P_ATM.value, gas.n2)
+        return BMTissueCheckpoint(ambient_pressure=P_ATM.value, n2_pressures=n2_pressures)
+
+
 class BMCompartimentProfiles:
     def __init__(self,
             compartiments: list[BMCompartiment], gf_low: float, gf_high: float, 
             depth_profile: DepthProfile, gas_usage_profile: GasUsageProfile,
-            gas_supply_set: GasSupplySet, start_ambient_pressure: Pressure, start_n2_pressure: Pressure,
+            gas_supply_set: GasSupplySet, start_ambient_pressure: Pressure, start_n2_pressure: Pressure | np.ndarray,
+            exact: bool = False,
+        ):
+        table = BMCompartimentTable(compartiments)
+        times = np.array(depth_profile.timeline.values)
+        ambient_pressures = BMCompartimentProfiles.ambient_pressures_of(depth_profile, start_ambient_pressure)
+        n2_pressures, pressure_gf_low = table.load(
+            start_n2_pressures=n2_pressure_values(start_n2_pressure), durations=np.diff(times), ambient_pressures=ambient_pressures,
+            n2_fractions=BMCompartimentProfiles.n2_fractions_of(depth_profile, gas_usage_profile, gas_supply_set), exact=exact, gf_low=gf_low,
+        )
+        self._init_arrays(table, gf_low, gf_high, times, ambient_pressures, n2_pressures, pressure_gf_low)
+
+    @staticmethod
+    def from_arrays(
+            table: BMCompartimentTable, gf_low: float, gf_high: float,
+            times: np.ndarray, ambient_pressures: np.ndarray, n2_pressures: np.ndarray, pressure_gf_low: float | None,
+        ) -> Self:
+        # profiles of tissue pressures integrated elsewhere, e.g. by BMCompartimentTable.load_batch
+        compartiment_profiles = BMCompartimentProfiles.__new__(BMCompartimentProfiles)
+        compartiment_profiles._init_arrays(table, gf_low, gf_high, times, ambient_pressures, n2_pressures, pressure_gf_low)
+        return compartiment_profiles
+
+    def _init_arrays(self,
+            table: BMCompartimentTable, gf_low: float, gf_high: float,
+            times: np.ndarray, ambient_pressures: np.ndarray, n2_pressures: np.ndarray, pressure_gf_low: float | None,
         ):
+        self.table = table
+        self.times = times
+        self.ambient_pressures = ambient_pressures
+        self.n2_pressures = n2_pressures
+        self.pressure_gf_low = Pressure(pressure_gf_low) if pressure_gf_low is not None else None
         self.profiles = {
-            compartiment.name: BMCompartimentProfile.create(
-                compartiment=compartiment,
-                depth_profile=depth_profile, gas_usage_profile=gas_usage_profile,
-                gas_supply_set=gas_supply_set, start_ambient_pressure=start_ambient_pressure, start_n2_pressure=start_n2_pressure,
-            ) for compartiment in compartiments
+            compartiment.name: BMCompartimentProfile(compartiment=compartiment, ambient_pressures=ambient_pressures, n2_pressures=compartiment_n2_pressures)
+                for compartiment, compartiment_n2_pressures in zip(table.compartiments, n2_pressures)
         }
         self.gf_low = gf_low
         self.gf_high = gf_high
 
+    @staticmethod
+    def ambient_pressures_of(depth_profile: DepthProfile, start_ambient_pressure: Pressure) -> np.ndarray:
+        ambient_pressures = pressure_from_depth(Depth(depth_profile.values)).value.copy()
+        ambient_pressures[0] = start_ambient_pressure.value
+        return ambient_pressures
+
+    @staticmethod
+    def n2_fractions_of(depth_profile: DepthProfile, gas_usage_profile: GasUsageProfile, gas_supply_set: GasSupplySet) -> np.ndarray:
+        gas_supply_names, _ = gas_usage_profile.segment_arrays(depth_profile.timeline)
+        return BMCompartimentProfiles.n2_fractions_for(gas_supply_names, gas_supply_set)
+
+    @staticmethod
+    def n2_fractions_for(gas_supply_names: np.ndarray, gas_supply_set: GasSupplySet) -> np.ndarray:
+        n2_fractions = np.empty(len(gas_supply_names))
+        for name, gas_supply in gas_supply_set.gas_supplies.items():
+            n2_fractions[gas_supply_names == name] = gas_supply.gas.n2
+        return n2_fractions
+
     def __getitem__(self, compartiment_name: str) -> BMCompartimentProfile:
         return self.profiles[compartiment_name]
 
-    @cached_property
-    def pressure_gf_low(self):
-        return max(
-            state.ambient_pressure
-                for profile in self.profiles.values()
-                    for state in profile.states
-                        if state.gradient_factor > self.gf_low
+    def checkpoint(self) -> BMTissueCheckpoint:
+        return BMTissueCheckpoint(ambient_pressure=float(self.ambient_pressures[-1]), n2_pressures=self.n2_pressures[:, -1].copy())
+
+    def ceiling_profile(self, gf_low: float | None = None, gf_high: float | None = None, pressure_gf_low: Pressure | None = None) -> 'BMCeilingProfile':
+        gf_low = self.gf_low if gf_low is None else gf_low
+        gf_high = self.gf_high if gf_high is None else gf_high
+        pressure_gf_low = self.pressure_gf_low if pressure_gf_low is None else pressure_gf_low
+        if pressure_gf_low is not None and pressure_gf_low.value <= P_ATM.value:
+            # exceeded only on surfacing, the gradient factor line has no span to anchor it
+            pressure_gf_low = None
+        if pressure_gf_low is None:
+            # gf_low was never exceeded, so gf_high applies at all depths
+            agf, bgf = self.table.constant_gf_coefficients(gf_high)
+            ceiling_pressures = self.table.ceiling_pressures(self.n2_pressures.T, agf, bgf)
+        else:
+            agf, bgf = self.table.gf_coefficients(gf_low, gf_high, pressure_gf_low.value)
+            ceiling_pressures = self.table.gf_ceiling_pressures(self.n2_pressures.T, gf_low, gf_high, pressure_gf_low.value)
+        compartiment_indices = ceiling_pressures.argmax(axis=1)
+        leading_ceiling_pressures = ceiling_pressures[np.arange(len(self.times)), compartiment_indices]
+        a = self.table.a[compartiment_indices]
+        b = self.table.b[compartiment_indices]
+        gradient_factors = (agf[compartiment_indices] + self.ambient_pressures/bgf[compartiment_indices] - self.ambient_pressures)/(a + self.ambient_pressures/b - self.ambient_pressures)
+        if pressure_gf_low is not None:
+            gradient_factors = np.where(self.ambient_pressures >= pressure_gf_low.value, gf_low, gradient_factors)
+        return BMCeilingProfile(
+            times=self.times,
+            depths=np.maximum(depth_from_pressure(Pressure(leading_ceiling_pressures)).value, 0),
+            compartiment_indices=compartiment_indices,
+            gradient_factors=gradient_factors,
+        )
+
+
+class BMCeilingProfile:
+    def __init__(self, times: np.ndarray, depths: np.ndarray, compartiment_indices: np.ndarray, gradient_factors: np.ndarray):
+        self.times = times
+        self.depths = depths # GF-limited ceiling depth of the leading compartiment
+        self.compartiment_indices = compartiment_indices # leading compartiment per timestep
+        self.gradient_factors = gradient_factors # gradient factor allowed at the ambient pressure of each timestep
+
+
+class BMTissueStream:
+    # integrates tissue loading chunk by chunk, only the state at the end of the last chunk is kept
+    def __init__(self, table: BMCompartimentTable, gf_low: float, ambient_pressure: float, n2_pressures: np.ndarray, exact: bool = True):
+        self.table = table
+        self.gf_low = gf_low
+        self.ambient_pressure = ambient_pressure
+        self.n2_pressures = n2_pressures
+        self.exact = exact
+        self.pressure_gf_low = None
+
+    def feed(self, durations: np.ndarray, ambient_pressures: np.ndarray, n2_fractions: np.ndarray) -> np.ndarray:
+        # n2 pressures (compartiments x samples) at the end of each of the given segments
+        n2_pressures, pressure_gf_low = self.table.load(
+            start_n2_pressures=self.n2_pressures, durations=durations,
+            ambient_pressures=np.concatenate(([self.ambient_pressure], ambient_pressures)), n2_fractions=n2_fractions,
+            exact=self.exact, gf_low=self.gf_low,
         )
+        if pressure_gf_low is not None and (self.pressure_gf_low is None or pressure_gf_low > self.pressure_gf_low):
+            self.pressure_gf_low = pressure_gf_low
+        self.ambient_pressure = float(ambient_pressures[-1]) if len(ambient_pressures) else self.ambient_pressure
+        self.n2_pressures = n2_pressures[:, -1].copy()
+        return n2_pressures[:, 1:]
+
+    def checkpoint(self) -> BMTissueCheckpoint:
+        return BMTissueCheckpoint(ambient_pressure=self.ambient_pressure, n2_pressures=self.n2_pressures.copy())
+
+
+class BMDecoSchedule:
+    def __init__(self,
+            bottom_plan: DivePlan, rows: list[DivePlanRow], stops: list[tuple[Depth, Time]],
+            first_stop: Depth | None, pressure_gf_low: Pressure | None,
+        ):
+        self.bottom_plan = bottom_plan
+        self.rows = rows
+        self.stops = stops
+        self.first_stop = first_stop
+        self.pressure_gf_low = pressure_gf_low
+
+    def __str__(self) -> str:
+        return ' | '.join(f"{depth.value:g}m {duration}" for depth, duration in self.stops) or 'no stops'
+
+    @property
+    def deco_time(self) -> Time:
+        return sum((duration for _, duration in self.stops), T0)
+
+    @cached_property
+    def dive_plan(self) -> DivePlan:
+        return DivePlan(self.bottom_plan.start_gas_supply_set, self.bottom_plan.rows + self.rows)
 
 
 class Buhlmann:
-    def __init__(self, compartiments: list[BMCompartiment], gf_low: float, gf_high: float):
+    def __init__(self, compartiments: list[BMCompartiment], gf_low: float, gf_high: float, exact: bool = False):
         self.compartiments = compartiments
         self.gf_low = gf_low
         self.gf_high = gf_high
+        self.exact = exact
+
+    @cached_property
+    def table(self) -> BMCompartimentTable:
+        return BMCompartimentTable(self.compartiments)
     
     def compartiment_profiles(self,
             depth_profile: DepthProfile, gas_usage_profile: GasUsageProfile,
-            gas_supply_set: GasSupplySet, start_ambient_pressure: Pressure = P_ATM, start_n2_pressure: Pressure = AIR.ppn2(P_ATM),
+            gas_supply_set: GasSupplySet, start_ambient_pressure: Pressure = P_ATM, start_n2_pressure: Pressure | np.ndarray = PPN2_ATM,
+            start_checkpoint: BMTissueCheckpoint | None = None,
         ) -> BMCompartimentProfiles:
+        if start_checkpoint is not None:
+            start_ambient_pressure = start_checkpoint.start_ambient_pressure
+            start_n2_pressure = start_checkpoint.start_n2_pressure
         return BMCompartimentProfiles(
             compartiments=self.compartiments, gf_low=self.gf_low, gf_high=self.gf_high,
             depth_profile=depth_profile, gas_usage_profile=gas_usage_profile,
             gas_supply_set=gas_supply_set, start_ambient_pressure=start_ambient_pressure, start_n2_pressure=start_n2_pressure,
+            exact=self.exact,
+        )
+
+    def batch_compartiment_profiles(self,
+            dives: list[Dive], start_ambient_pressure: Pressure = P_ATM, start_n2_pressure: Pressure = PPN2_ATM,
+            start_checkpoints: list[BMTissueCheckpoint] | None = None, batch_size: int = 16,
+        ) -> list[BMCompartimentProfiles]:
+        # compartiment_profiles() of every dive, integrated together in batches of dives of similar length
+        ambient_pressures = []
+        n2_fractions = []
+        start_n2_pressures = np.full((len(dives), len(self.table)), start_n2_pressure.value)
+        for index, dive in enumerate(dives):
+            dive_start_ambient_pressure = start_ambient_pressure
+            if start_checkpoints is not None:
+                dive_start_ambient_pressure = start_checkpoints[index].start_ambient_pressure
+                start_n2_pressures[index] = start_checkpoints[index].n2_pressures
+            ambient_pressures.append(BMCompartimentProfiles.ambient_pressures_of(dive.depth_profile, dive_start_ambient_pressure))
+            n2_fractions.append(BMCompartimentProfiles.n2_fractions_of(dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set))
+        times = [np.array(dive.timeline.values) for dive in dives]
+        order = sorted(range(len(dives)), key=lambda index: len(times[index]))
+        compartiment_profiles = [None]*len(dives)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            length = len(times[batch[-1]])
+            padded_durations = np.zeros((len(batch), length - 1))
+            padded_ambient_pressures = np.empty((len(batch), length))
+            padded_n2_fractions = np.zeros((len(batch), length - 1))
+            for row, index in enumerate(batch):
+                steps = len(times[index])
+                padded_durations[row, :steps - 1] = np.diff(times[index])
+                padded_ambient_pressures[row, :steps] = ambient_pressures[index]
+                padded_ambient_pressures[row, steps:] = ambient_pressures[index][-1]
+                padded_n2_fractions[row, :steps - 1] = n2_fractions[index]
+            n2_pressures, pressures_gf_low = self.table.load_batch(
+                start_n2_pressures[batch], padded_durations, padded_ambient_pressures, padded_n2_fractions, exact=self.exact, gf_low=self.gf_low,
+            )
+            for row, index in enumerate(batch):
+                steps = len(times[index])
+                compartiment_profiles[index] = BMCompartimentProfiles.from_arrays(
+                    table=self.table, gf_low=self.gf_low, gf_high=self.gf_high, times=times[index], ambient_pressures=ambient_pressures[index],
+                    n2_pressures=n2_pressures[row, :, :steps], pressure_gf_low=None if np.isnan(pressures_gf_low[row]) else float(pressures_gf_low[row]),
+                )
+        return compartiment_profiles
+
+    def tissue_stream(self, start_ambient_pressure: Pressure = P_ATM, start_n2_pressure: Pressure = PPN2_ATM) -> BMTissueStream:
+        # always exact, the sample spacing is set by the log and Haldane steps are limited to 10 s
+        return BMTissueStream(
+            table=self.table, gf_low=self.gf_low, ambient_pressure=start_ambient_pressure.value,
+            n2_pressures=np.full(len(self.table), start_n2_pressure.value), exact=True,
         )
 
+    def surface_interval(self, checkpoint: BMTissueCheckpoint, duration: Time, gas: Gas = AIR) -> BMTissueCheckpoint:
+        return checkpoint.surface_interval(self.table, duration, gas=gas)
+
+    def bottom_profiles(self, bottom_plan: DivePlan, start_n2_pressure: Pressure | np.ndarray = PPN2_ATM) -> BMCompartimentProfiles:
+        return BMCompartimentProfiles(
+            compartiments=self.compartiments, gf_low=self.gf_low, gf_high=self.gf_high,
+            depth_profile=bottom_plan.depth_profile, gas_usage_profile=bottom_plan.gas_usage_profile,
+            gas_supply_set=bottom_plan.start_gas_supply_set, start_ambient_pressure=P_ATM, start_n2_pressure=start_n2_pressure,
+            exact=True,
+        )
+
+    def schedule(self, bottom_plan: DivePlan, start_n2_pressure: Pressure | np.ndarray = PPN2_ATM, **schedule_options) -> BMDecoSchedule:
+        bottom_profiles = self.bottom_profiles(bottom_plan, start_n2_pressure=start_n2_pressure)
+        return self.schedule_from(bottom_profiles.n2_pressures[:, -1], bottom_plan, **schedule_options)
+
+    def schedule_from(self,
+            n2_pressures: np.ndarray, bottom_plan: DivePlan,
+            ascent_rate_mmin: float = 9, stop_interval_m: float = 3, last_stop_m: float = 3,
+            stop_step_min: float = 1, gas_switch_min: float = 1, max_ppo2: Pressure = MAX_DECO_PPO2, deco_sac_lmin: float | None = None,
+        ) -> BMDecoSchedule:
+        # walks up the stop grid from a checkpointed tissue state, stop lengths are bisected from the state on arrival
+        last_row = bottom_plan.rows[-1]
+        gas_supply_set = bottom_plan.start_gas_supply_set
+        gas_supply_name = last_row.gas_supply_name
+        gas = gas_supply_set[gas_supply_name].gas
+        sac_lmin = deco_sac_lmin if deco_sac_lmin is not None else last_row.sac.value*60e3
+        rows = []
+        stops = []
+        first_stop = pressure_gf_low = None
+        depth_m = last_row.depth.value
+        min_steps = 0
+        while depth_m > 0:
+            next_depth_m = (math.ceil(depth_m/stop_interval_m) - 1)*stop_interval_m
+            if next_depth_m < last_stop_m:
+                next_depth_m = 0
+            ambient_pressure = pressure_from_depth(Depth(depth_m)).value
+            next_ambient_pressure = pressure_from_depth(Depth(next_depth_m)).value
+            ascent_duration = Time(min=(depth_m - next_depth_m)/ascent_rate_mmin).value
+
+            def stop_clears(
+                    steps: int, tolerated_pressures: np.ndarray, n2_pressures: np.ndarray = n2_pressures, gas: Gas = gas,
+                    ambient_pressure: float = ambient_pressure, next_ambient_pressure: float = next_ambient_pressure, ascent_duration: float = ascent_duration,
+                ) -> bool:
+                stopped = self.table.advance(n2_pressures, steps*Time(min=stop_step_min).value, ambient_pressure, ambient_pressure, gas.n2)
+                ascended = self.table.advance(stopped, ascent_duration, ambient_pressure, next_ambient_pressure, gas.n2)
+                return bool(np.all(ascended <= tolerated_pressures))
+
+            if pressure_gf_low is None and stop_clears(min_steps, self.table.tolerated_pressures(next_ambient_pressure, self.gf_low)):
+                steps = min_steps
+            else:
+                if pressure_gf_low is None:
+                    pressure_gf_low = ambient_pressure
+                agf, bgf = self.table.gf_coefficients(self.gf_low, self.gf_high, pressure_gf_low)
+                tolerated_pressures = agf + next_ambient_pressure/bgf
+                steps = self._bisect_steps(lambda steps, tolerated_pressures=tolerated_pressures: stop_clears(steps, tolerated_pressures), min_steps)
+            if steps:
+                if first_stop is None and pressure_gf_low is not None:
+                    # deepest stop made once gf_low is anchored, the anchor itself may clear without stopping
+                    first_stop = Depth(depth_m)
+                stop_min = steps*stop_step_min
+                stops.append((Depth(depth_m), Time(min=stop_min)))
+                rows.append([depth_m, stop_min, gas_supply_name, sac_lmin])
+                n2_pressures = self.table.advance(n2_pressures, Time(min=stop_min).value, ambient_pressure, ambient_pressure, gas.n2)
+            n2_pressures = self.table.advance(n2_pressures, ascent_duration, ambient_pressure, next_ambient_pressure, gas.n2)
+            next_gas_supply_name = self._best_gas_supply_name(gas_supply_set, gas_supply_name, next_ambient_pressure, max_ppo2)
+            if rows and not steps and rows[-1][0] == depth_m and rows[-1][2] == next_gas_supply_name:
+                rows[-1][0] = next_depth_m
+                rows[-1][1] += (depth_m - next_depth_m)/ascent_rate_mmin
+            else:
+                rows.append([next_depth_m, (depth_m - next_depth_m)/ascent_rate_mmin, next_gas_supply_name, sac_lmin])
+            min_steps = math.ceil(gas_switch_min/stop_step_min) if next_gas_supply_name != gas_supply_name else 0
+            gas_supply_name = next_gas_supply_name
+            gas = gas_supply_set[gas_supply_name].gas
+            depth_m = next_depth_m
+        return BMDecoSchedule(
+            bottom_plan=bottom_plan, rows=[DivePlanRow(*row) for row in rows], stops=stops, first_stop=first_stop,
+            pressure_gf_low=Pressure(pressure_gf_low) if pressure_gf_low is not None else None,
+        )
+
+    @staticmethod
+    def _bisect_steps(clears, min_steps: int, max_steps: int = 24*60) -> int:
+        # fewest steps from min_steps on that clear, doubling up to max_steps itself and then bisecting
+        if clears(min_steps):
+            return min_steps
+        low, high = min_steps, max(min_steps, 1)
+        while not clears(high):
+            if high >= max_steps:
+                raise ValueError(f"No stop of up to {max_steps} steps clears the ceiling.")
+            low, high = high, min(2*high, max_steps)
+        while high - low > 1:
+            middle = (low + high)//2
+            if clears(middle):
+                high = middle
+            else:
+                low = middle
+        return high
+
+    @staticmethod
+    def _best_gas_supply_name(gas_supply_set: GasSupplySet, gas_supply_name: str, ambient_pressure: float, max_ppo2: Pressure) -> str:
+        best_name = gas_supply_name
+        for name, gas_supply in gas_supply_set.gas_supplies.items():
+            if gas_supply.gas.o2 > gas_supply_set[best_name].gas.o2 and gas_supply.gas.ppo2(Pressure(ambient_pressure)) <= max_ppo2:
+                best_name = name
+        return best_name
+
 
-def zh_l16c(gf_low: float, gf_high: float) -> Buhlmann:
+def zh_l16c(gf_low: float, gf_high: float, exact: bool = False) -> Buhlmann:
     compartiments = [
         BMCompartiment(name=f"Compartiment {row+1}", halftime=Time(min=halftime), a=Pressure(a*1e5), b=b)
             for row, (halftime, a, b) in enumerate([
@@ -154,4 +670,4 @@ def zh_l16c(gf_low: float, gf_high: float) -> Buhlmann:
                 (   635.0,  0.2327, 0.9653  ),
             ])
     ]
-    return Buhlmann(compartiments=compartiments, gf_low=gf_low, gf_high=gf_high)
+    return Buhlmann(compartiments=compartiments, gf_low=gf_low, gf_high=gf_high, exact=exact)
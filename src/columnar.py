@@ -0,0 +1,123 @@
+import json
+import os
+import struct
+from typing import Self
+
+import numpy as np
+
+from .dive_evaluation import DiveEvaluation
+from .quantity import Time
+
+# File layout: MAGIC, the data offset and header length as little-endian uint64, a JSON header describing the
+# columns, then every column as raw little-endian C-order bytes aligned to COLUMN_ALIGNMENT. Two dimensional
+# columns store one row per gas supply or compartiment, so a single row or a time range of it maps only the
+# pages it touches.
+MAGIC = b'DIVECOL1'
+PREAMBLE = struct.Struct('<8sQQ')
+COLUMN_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset//COLUMN_ALIGNMENT)*COLUMN_ALIGNMENT
+
+
+class DiveColumns:
+    def __init__(self, path: str | os.PathLike, header: dict, columns: dict[str, np.ndarray]):
+        self.path = path
+        self.header = header
+        self.columns = columns # read-only views into the memory-mapped file, pages are read when accessed
+        self.gas_supply_names: list[str] = header['gas_supply_names']
+        self.compartiment_names: list[str] = header['compartiment_names']
+        self.gf_low: float = header['gf_low']
+        self.gf_high: float = header['gf_high']
+        self.pressure_gf_low: float | None = header['pressure_gf_low']
+
+    @staticmethod
+    def write(path: str | os.PathLike, evaluation: DiveEvaluation):
+        gas_supply_names = list(evaluation.cylinder_pressures)
+        compartiment_profiles = evaluation.compartiment_profiles
+        gas_supply_indices = {name: index for index, name in enumerate(gas_supply_names)}
+        arrays = {
+            'ticks': np.array(evaluation.timeline.ticks, dtype='<i8'), # ms
+            'depths': evaluation.depths.astype('<f8'), # m
+            'ambient_pressures': evaluation.ambient_pressures.astype('<f8'), # Pa
+            'gas_supply_indices': np.array([gas_supply_indices[name] for name in evaluation.gas_supply_names.tolist()], dtype='<i2'), # per segment
+            'sacs': evaluation.sacs.astype('<f8'), # m3/s per segment
+            'cylinder_pressures': np.array([evaluation.cylinder_pressures[name] for name in gas_supply_names], dtype='<f8').reshape(len(gas_supply_names), -1), # Pa
+            'n2_pressures': np.ascontiguousarray(evaluation.n2_pressures, dtype='<f8'), # Pa, (compartiment, time)
+        }
+        columns = {}
+        offset = 0
+        for name, array in arrays.items():
+            columns[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _aligned(offset + array.nbytes)
+        pressure_gf_low = evaluation.pressure_gf_low
+        header = json.dumps({
+            'columns': columns,
+            'gas_supply_names': gas_supply_names,
+            'compartiment_names': list(compartiment_profiles.profiles),
+            'gf_low': compartiment_profiles.gf_low,
+            'gf_high': compartiment_profiles.gf_high,
+            'pressure_gf_low': None if pressure_gf_low is None else pressure_gf_low.value,
+        }).encode()
+        data_offset = _aligned(PREAMBLE.size + len(header))
+        with open(path, 'wb') as file:
+            file.write(PREAMBLE.pack(MAGIC, data_offset, len(header)))
+            file.write(header)
+            for name, array in arrays.items():
+                file.seek(data_offset + columns[name]['offset'])
+                file.write(array.tobytes())
+            file.truncate(data_offset + offset)
+
+    @staticmethod
+    def open(path: str | os.PathLike) -> Self:
+        with open(path, 'rb') as file:
+            magic, data_offset, header_length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a dive column file.")
+            header = json.loads(file.read(header_length))
+        # one read-only mapping of the file, the columns are views into it
+        mapping = np.memmap(path, dtype=np.uint8, mode='r')
+        columns = {
+            name: np.ndarray(tuple(column['shape']), dtype=np.dtype(column['dtype']), buffer=mapping, offset=data_offset + column['offset'])
+                for name, column in header['columns'].items()
+        }
+        return DiveColumns(path, header, columns)
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+    @property
+    def ticks(self) -> np.ndarray:
+        return self.columns['ticks']
+
+    @property
+    def depths(self) -> np.ndarray:
+        return self.columns['depths']
+
+    @property
+    def ambient_pressures(self) -> np.ndarray:
+        return self.columns['ambient_pressures']
+
+    @property
+    def gas_supply_indices(self) -> np.ndarray:
+        return self.columns['gas_supply_indices']
+
+    @property
+    def sacs(self) -> np.ndarray:
+        return self.columns['sacs']
+
+    @property
+    def n2_pressures(self) -> np.ndarray:
+        return self.columns['n2_pressures']
+
+    def cylinder_pressures(self, gas_supply_name: str) -> np.ndarray:
+        return self.columns['cylinder_pressures'][self.gas_supply_names.index(gas_supply_name)]
+
+    def compartiment_n2_pressures(self, compartiment: str | int) -> np.ndarray:
+        index = compartiment if isinstance(compartiment, int) else self.compartiment_names.index(compartiment)
+        return self.n2_pressures[index]
+
+    def time_slice(self, start: Time, stop: Time) -> slice:
+        # indices of the times within [start, stop], found by binary search so only a few pages of ticks are read
+        return slice(int(np.searchsorted(self.ticks, start.ms, side='left')), int(np.searchsorted(self.ticks, stop.ms, side='right')))
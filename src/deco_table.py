@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Self
+
+import numpy as np
+
+from .buhlmann import Buhlmann
+from .dive_plan import DivePlan
+from .gas_profile import GasSupplySet
+from .physics import AIR, P_ATM, pressure_from_depth
+from .quantity import Depth, Pressure, Time
+
+MAX_BOTTOM_PPO2 = Pressure(1.4e5)
+
+
+class DecoTable:
+    def __init__(self,
+            gas_supply_names: list[str], depths_m: np.ndarray, bottom_times_min: np.ndarray,
+            ndls: np.ndarray, first_stops: np.ndarray, deco_times: np.ndarray, runtimes: np.ndarray,
+        ):
+        self.gas_supply_names = gas_supply_names
+        self.depths_m = depths_m
+        self.bottom_times_min = bottom_times_min
+        self.ndls = ndls # (gas, depth) no-decompression limit in min, inf without a limit, nan where the gas is not breathable
+        self.first_stops = first_stops # (gas, depth, bottom time) first stop depth in m, nan without deco
+        self.deco_times = deco_times # (gas, depth, bottom time) total stop time in s
+        self.runtimes = runtimes # (gas, depth, bottom time) time to the surface in s
+
+    @staticmethod
+    def create(
+            algorithm: Buhlmann, gas_supply_set: GasSupplySet, depths_m: list[float], bottom_times_min: list[float],
+            gas_supply_names: list[str] | None = None, descent_rate_mmin: float = 18, sac_lmin: float = 20,
+            max_bottom_ppo2: Pressure = MAX_BOTTOM_PPO2, max_ndl_min: int = 6*60, processes: int | None = None, **schedule_options,
+        ) -> Self:
+        # Bottom times include the descent. Every (gas, depth) row shares its descent, so the tissue state on
+        # arrival is computed once per row and the bottom times and NDL bisection continue from it.
+        gas_supply_names = list(gas_supply_set.gas_supplies) if gas_supply_names is None else gas_supply_names
+        depths_m = np.asarray(depths_m, dtype=float)
+        bottom_times_min = np.asarray(bottom_times_min, dtype=float)
+        tasks = [
+            (algorithm.compartiments, algorithm.gf_low, algorithm.gf_high, gas_supply_set, gas_supply_name, depth_m,
+                bottom_times_min, descent_rate_mmin, sac_lmin, max_bottom_ppo2, max_ndl_min, schedule_options)
+                for gas_supply_name in gas_supply_names for depth_m in depths_m
+        ]
+        if processes == 1:
+            results = list(map(_tabulate_depth, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_tabulate_depth, tasks))
+        shape = (len(gas_supply_names), len(depths_m))
+        ndls = np.array([ndl for ndl, _ in results]).reshape(shape)
+        first_stops, deco_times, runtimes = np.array([cells for _, cells in results]).reshape(shape + (len(bottom_times_min), 3)).transpose(3, 0, 1, 2)
+        return DecoTable(
+            gas_supply_names=gas_supply_names, depths_m=depths_m, bottom_times_min=bottom_times_min,
+            ndls=ndls, first_stops=first_stops, deco_times=deco_times, runtimes=runtimes,
+        )
+
+    def __getitem__(self, cell: tuple[str, float, float]) -> tuple[float, float, float]:
+        # first stop, deco time and runtime of the nearest tabulated depth and bottom time
+        gas_supply_name, depth_m, bottom_time_min = cell
+        g = self.gas_supply_names.index(gas_supply_name)
+        i = int(np.argmin(np.abs(self.depths_m - depth_m)))
+        j = int(np.argmin(np.abs(self.bottom_times_min - bottom_time_min)))
+        return self.first_stops[g, i, j], self.deco_times[g, i, j], self.runtimes[g, i, j]
+
+    def __str__(self) -> str:
+        lines = []
+        for g, gas_supply_name in enumerate(self.gas_supply_names):
+            lines.append(f"{gas_supply_name}: runtime [min] by depth [m] and bottom time [min]")
+            lines.append(f"{'m':>4} {'NDL':>5} " + ' '.join(f"{bottom_time_min:>5g}" for bottom_time_min in self.bottom_times_min))
+            for i, depth_m in enumerate(self.depths_m):
+                cells = ' '.join(f"{runtime/60:>5.0f}" for runtime in self.runtimes[g, i])
+                lines.append(f"{depth_m:>4g} {self.ndls[g, i]:>5g} {cells}")
+        return '\n'.join(lines)
+
+
+def _tabulate_depth(task: tuple) -> tuple[float, list[tuple[float, float, float]]]:
+    (compartiments, gf_low, gf_high, gas_supply_set, gas_supply_name, depth_m,
+        bottom_times_min, descent_rate_mmin, sac_lmin, max_bottom_ppo2, max_ndl_min, schedule_options) = task
+    gas = gas_supply_set[gas_supply_name].gas
+    ambient_pressure = pressure_from_depth(Depth(depth_m)).value
+    if gas.ppo2(Pressure(ambient_pressure)) > max_bottom_ppo2:
+        return np.nan, [(np.nan, np.nan, np.nan)]*len(bottom_times_min)
+    algorithm = Buhlmann(compartiments, gf_low=gf_low, gf_high=gf_high)
+    table = algorithm.table
+    descent_min = depth_m/descent_rate_mmin
+    arrival_n2_pressures = table.advance(
+        np.full(len(table), AIR.ppn2(P_ATM).value), Time(min=descent_min).value, P_ATM.value, ambient_pressure, gas.n2,
+    )
+
+    def schedule(bottom_time_min: float, gas_supply_set: GasSupplySet = gas_supply_set):
+        bottom_plan = DivePlan.from_table(gas_supply_set, [
+            (0, 0, gas_supply_name, sac_lmin),
+            (depth_m, descent_min, gas_supply_name, sac_lmin),
+            (depth_m, bottom_time_min - descent_min, gas_supply_name, sac_lmin),
+        ])
+        n2_pressures = table.advance(arrival_n2_pressures, Time(min=bottom_time_min - descent_min).value, ambient_pressure, ambient_pressure, gas.n2)
+        return algorithm.schedule_from(n2_pressures, bottom_plan, **schedule_options)
+
+    # The NDL is for a direct ascent on the bottom gas, one minute short of the first whole minute that
+    # needs a stop, found by the same bisection as the stop lengths. It is unlimited only when a bottom time of
+    # max_ndl_min itself needs no stop.
+    bottom_gas_supply_set = GasSupplySet(**{gas_supply_name: gas_supply_set[gas_supply_name]})
+    min_minutes = int(np.ceil(descent_min))
+    try:
+        ndl = Buhlmann._bisect_steps(lambda minutes: bool(schedule(minutes, bottom_gas_supply_set).stops), min_minutes, max_steps=max_ndl_min) - 1
+    except ValueError:
+        ndl = np.inf
+    cells = []
+    for bottom_time_min in bottom_times_min:
+        if bottom_time_min < descent_min:
+            cells.append((np.nan, np.nan, np.nan))
+            continue
+        deco_schedule = schedule(bottom_time_min)
+        ascent_time = sum(row.duration.value for row in deco_schedule.rows)
+        cells.append((
+            deco_schedule.first_stop.value if deco_schedule.first_stop is not None else np.nan,
+            deco_schedule.deco_time.value,
+            Time(min=bottom_time_min).value + ascent_time,
+        ))
+    return ndl, cells
@@ -1,31 +1,60 @@
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping
+from functools import cached_property
 from typing import Self
+
+import numpy as np
+
 from .timeline import Timeline, TimeSegment
 from .quantity import Depth, Time
 
 
+class DepthProfileDepths(Mapping):
+    # Depth objects of an array-backed DepthProfile, created on access
+    def __init__(self, timeline: Timeline, values: np.ndarray):
+        self.timeline = timeline
+        self.values = values
+
+    def __getitem__(self, time: Time) -> Depth:
+        indices = self.timeline.indices(time)
+        if not indices:
+            raise KeyError(time)
+        return Depth(float(self.values[indices[-1]]))
+
+    def __iter__(self) -> Iterator[Time]:
+        return iter(self.timeline)
+
+    def __len__(self) -> int:
+        return len(self.timeline)
+
+
 class DepthProfile:
-    def __init__(self, timeline: Timeline, depths: dict[Time, Depth]):
+    def __init__(self, timeline: Timeline, depths: Mapping[Time, Depth]):
         self.timeline = timeline
         self.depths = depths
 
+    @staticmethod
+    def from_values(timeline: Timeline, values: np.ndarray) -> Self:
+        depth_profile = DepthProfile(timeline=timeline, depths=DepthProfileDepths(timeline, values))
+        depth_profile.values = values
+        return depth_profile
+
+    @cached_property
+    def values(self) -> np.ndarray:
+        # depth in m at every time of the timeline
+        return np.array([self.depths[time].value for time in self.timeline])
+
     def __getitem__(self, time: Time) -> Depth:
         try:
             return self.depths[time]
         except KeyError:
-            return self._interpolate_depth(self.timeline.segment_for(time), time)
+            # interpolated between the two surrounding times found by binary search, clamped outside the timeline
+            ticks = self.timeline.ticks
+            index = min(max(bisect_left(ticks, time.ms), 1), len(ticks) - 1)
+            return Depth(float(np.interp(time.ms, ticks[index - 1:index + 1], self.values[index - 1:index + 1])))
     
     def average_depth(self, segment: TimeSegment) -> Depth:
         return (self.depths[segment.start] + self.depths[segment.stop])/2
-
-    def _interpolate_depth(self, segment: TimeSegment, time: Time) -> Depth:
-        time0 = segment.start
-        time1 = segment.stop
-        depth0 = self[segment.start]
-        depth1 = self[segment.stop ]
-        return ((depth0*(time1 - time) + depth1*(time - time0))/(time1 - time0))
     
     def interpolate(depth_profile: Self, timeline: Timeline) -> Self:
-        depths = {}
-        for time in timeline:
-            depths[time] = depth_profile[time]
-        return DepthProfile(timeline=timeline, depths=depths)
+        return DepthProfile.from_values(timeline, np.interp(timeline.values, depth_profile.timeline.values, depth_profile.values))
@@ -0,0 +1,98 @@
+from functools import cached_property
+from typing import Self
+
+import numpy as np
+
+from .buhlmann import (
+    BMCeilingProfile,
+    BMCompartimentProfiles,
+    BMTissueCheckpoint,
+    Buhlmann,
+    n2_pressure_values,
+)
+from .depth_profile import DepthProfile
+from .dive import Dive
+from .gas_profile import GasSupplyProfile
+from .physics import P_ATM, PPN2_ATM, pressure_from_depth
+from .quantity import Depth, Pressure, Time
+from .timeline import Timeline
+
+
+class DiveEvaluation:
+    # Every series of a dive from one pass over its timeline: depths, ambient pressures and the active gas are
+    # computed once and shared by the cylinder pressures, the tissue loading and the ceiling.
+    def __init__(self,
+            dive: Dive, timeline: Timeline, depths: np.ndarray, ambient_pressures: np.ndarray,
+            gas_supply_names: np.ndarray, sacs: np.ndarray, cylinder_pressures: dict[str, np.ndarray],
+            compartiment_profiles: BMCompartimentProfiles,
+        ):
+        self.source = dive
+        self.timeline = timeline
+        self.depths = depths # depth in m at every time
+        self.ambient_pressures = ambient_pressures # ambient pressure at every time, the first one is the start ambient pressure
+        self.gas_supply_names = gas_supply_names # gas supply breathed during every segment
+        self.sacs = sacs # SAC during every segment
+        self.cylinder_pressures = cylinder_pressures # cylinder pressure per gas supply at every time
+        self.compartiment_profiles = compartiment_profiles
+
+    @staticmethod
+    def create(
+            algorithm: Buhlmann, dive: Dive, sample_period: Time | None = None,
+            start_ambient_pressure: Pressure = P_ATM, start_n2_pressure: Pressure | np.ndarray = PPN2_ATM,
+            start_checkpoint: BMTissueCheckpoint | None = None,
+        ) -> Self:
+        if start_checkpoint is not None:
+            start_ambient_pressure = start_checkpoint.start_ambient_pressure
+            start_n2_pressure = start_checkpoint.start_n2_pressure
+        timeline = dive.timeline if sample_period is None else dive.timeline.resample(sample_period)
+        times = np.array(timeline.values)
+        durations = np.diff(times)
+        depths = np.interp(times, dive.timeline.values, dive.depth_profile.values)
+        ambient_pressures = pressure_from_depth(Depth(depths)).value.copy()
+        ambient_pressures[0] = start_ambient_pressure.value
+        gas_supply_names, sacs = dive.gas_usage_profile.segment_arrays(timeline)
+        gas_supply_set = dive.start_gas_supply_set
+        cylinder_pressures = GasSupplyProfile.pressures_of(gas_supply_set, depths, durations, gas_supply_names, sacs)
+        n2_pressures, pressure_gf_low = algorithm.table.load(
+            start_n2_pressures=n2_pressure_values(start_n2_pressure), durations=durations, ambient_pressures=ambient_pressures,
+            n2_fractions=BMCompartimentProfiles.n2_fractions_for(gas_supply_names, gas_supply_set),
+            exact=algorithm.exact, gf_low=algorithm.gf_low,
+        )
+        compartiment_profiles = BMCompartimentProfiles.from_arrays(
+            table=algorithm.table, gf_low=algorithm.gf_low, gf_high=algorithm.gf_high, times=times,
+            ambient_pressures=ambient_pressures, n2_pressures=n2_pressures, pressure_gf_low=pressure_gf_low,
+        )
+        return DiveEvaluation(
+            dive=dive, timeline=timeline, depths=depths, ambient_pressures=ambient_pressures,
+            gas_supply_names=gas_supply_names, sacs=sacs, cylinder_pressures=cylinder_pressures,
+            compartiment_profiles=compartiment_profiles,
+        )
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.compartiment_profiles.times
+
+    @property
+    def n2_pressures(self) -> np.ndarray:
+        return self.compartiment_profiles.n2_pressures
+
+    @property
+    def pressure_gf_low(self) -> Pressure | None:
+        return self.compartiment_profiles.pressure_gf_low
+
+    @cached_property
+    def ceiling(self) -> BMCeilingProfile:
+        return self.compartiment_profiles.ceiling_profile()
+
+    def checkpoint(self) -> BMTissueCheckpoint:
+        return self.compartiment_profiles.checkpoint()
+
+    @cached_property
+    def dive(self) -> Dive:
+        # the evaluated dive on the evaluation timeline, equivalent to source.resample(sample_period)
+        return Dive(
+            timeline=self.timeline,
+            depth_profile=DepthProfile.from_values(self.timeline, self.depths),
+            gas_usage_profile=self.source.gas_usage_profile,
+            gas_supply_profile=GasSupplyProfile(self.timeline, self.source.start_gas_supply_set, self.cylinder_pressures),
+        )
@@ -0,0 +1,130 @@
+import csv
+from collections.abc import Iterable, Iterator
+from functools import cached_property
+from itertools import islice
+from typing import IO
+from xml.etree import ElementTree
+
+import numpy as np
+
+from .buhlmann import BMTissueStream, Buhlmann
+from .depth_profile import DepthProfile
+from .gas_profile import GasSupplySet
+from .physics import PPN2_ATM, pressure_from_depth
+from .quantity import Depth, Pressure, Time
+from .timeline import Timeline
+
+
+class DiveLogSample:
+    def __init__(self, time: Time, depth: Depth, gas_supply_name: str | None = None):
+        self.time = time
+        self.depth = depth
+        self.gas_supply_name = gas_supply_name # set on gas switches only
+
+
+def parse_time(text: str) -> Time:
+    # seconds, mm:ss or h:mm:ss
+    parts = [float(part) for part in text.strip().split(':')]
+    sec = 0
+    for part in parts:
+        sec = Time.sec_per_min*sec + part
+    return Time(sec)
+
+
+def read_csv_samples(
+        file: IO[str], time_column: str = 'time', depth_column: str = 'depth', gas_column: str | None = None,
+    ) -> Iterator[DiveLogSample]:
+    for row in csv.DictReader(file):
+        gas_supply_name = (row.get(gas_column) or None) if gas_column is not None else None
+        yield DiveLogSample(time=parse_time(row[time_column]), depth=Depth(float(row[depth_column])), gas_supply_name=gas_supply_name)
+
+
+def read_uddf_samples(file: IO | str, dive_index: int = 0, gas_supply_names: dict[str, str] | None = None) -> Iterator[DiveLogSample]:
+    # waypoints of one <dive>, elements are cleared as soon as they are read
+    dive_count = -1
+    in_dive = False
+    waypoint = {}
+    for event, element in ElementTree.iterparse(file, events=('start', 'end')):
+        tag = element.tag.rsplit('}', 1)[-1]
+        if event == 'start':
+            if tag == 'dive':
+                dive_count += 1
+                in_dive = dive_count == dive_index
+            continue
+        if tag == 'dive':
+            if in_dive:
+                return
+            element.clear()
+        elif in_dive and tag in ('divetime', 'depth'):
+            waypoint[tag] = float(element.text)
+        elif in_dive and tag == 'switchmix':
+            mix = element.get('ref')
+            waypoint['gas_supply_name'] = gas_supply_names.get(mix, mix) if gas_supply_names else mix
+        elif tag == 'waypoint':
+            if in_dive:
+                yield DiveLogSample(time=Time(waypoint['divetime']), depth=Depth(waypoint['depth']), gas_supply_name=waypoint.get('gas_supply_name'))
+            waypoint = {}
+            element.clear()
+
+
+class DiveLogChunk:
+    def __init__(self, times: np.ndarray, depths: np.ndarray, gas_supply_names: list[str], n2_pressures: np.ndarray):
+        self.times = times
+        self.depths = depths
+        self.gas_supply_names = gas_supply_names # gas breathed from each sample on
+        self.n2_pressures = n2_pressures # compartiments x samples
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @cached_property
+    def timeline(self) -> Timeline:
+        return Timeline([Time(time) for time in self.times.tolist()])
+
+    @cached_property
+    def depth_profile(self) -> DepthProfile:
+        return DepthProfile(timeline=self.timeline, depths={time: Depth(depth) for time, depth in zip(self.timeline, self.depths.tolist())})
+
+
+class DiveLogStream:
+    def __init__(self,
+            samples: Iterable[DiveLogSample], algorithm: Buhlmann, gas_supply_set: GasSupplySet, gas_supply_name: str,
+            chunk_size: int = 600, start_n2_pressure: Pressure = PPN2_ATM,
+        ):
+        self.samples = iter(samples)
+        self.algorithm = algorithm
+        self.gas_supply_set = gas_supply_set
+        self.gas_supply_name = gas_supply_name
+        self.chunk_size = chunk_size
+        self.start_n2_pressure = start_n2_pressure
+        self.tissue_stream: BMTissueStream | None = None
+        self.time = None
+
+    def __iter__(self) -> Iterator[DiveLogChunk]:
+        while chunk := list(islice(self.samples, self.chunk_size)):
+            yield self._feed(chunk)
+
+    def _feed(self, samples: list[DiveLogSample]) -> DiveLogChunk:
+        times = np.array([sample.time.value for sample in samples])
+        depths = np.array([sample.depth.value for sample in samples])
+        ambient_pressures = pressure_from_depth(Depth(depths)).value
+        if self.tissue_stream is None:
+            self.tissue_stream = self.algorithm.tissue_stream(start_ambient_pressure=Pressure(ambient_pressures[0]), start_n2_pressure=self.start_n2_pressure)
+            self.time = times[0]
+        n2_fractions = np.empty(len(samples))
+        gas_supply_names = []
+        for i, sample in enumerate(samples):
+            n2_fractions[i] = self.gas_supply_set[self.gas_supply_name].gas.n2 # gas breathed since the previous sample
+            if sample.gas_supply_name is not None:
+                self.gas_supply_name = sample.gas_supply_name
+            gas_supply_names.append(self.gas_supply_name)
+        durations = np.diff(np.concatenate(([self.time], times)))
+        self.time = times[-1]
+        n2_pressures = self.tissue_stream.feed(durations=durations, ambient_pressures=ambient_pressures, n2_fractions=n2_fractions)
+        return DiveLogChunk(times=times, depths=depths, gas_supply_names=gas_supply_names, n2_pressures=n2_pressures)
+
+    @property
+    def pressure_gf_low(self) -> Pressure | None:
+        if self.tissue_stream is None or self.tissue_stream.pressure_gf_low is None:
+            return None
+        return Pressure(self.tissue_stream.pressure_gf_low)
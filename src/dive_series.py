@@ -0,0 +1,62 @@
+import numpy as np
+
+from .buhlmann import (
+    BMCompartimentProfiles,
+    BMDecoSchedule,
+    BMTissueCheckpoint,
+    Buhlmann,
+)
+from .dive import Dive
+from .dive_plan import DivePlan
+from .physics import AIR, P_ATM
+from .quantity import T0, Time
+
+
+class DiveSeries:
+    # repetitive dives, each one starts from the cached end-of-dive checkpoint of the one before
+    def __init__(self, algorithm: Buhlmann, start_checkpoint: BMTissueCheckpoint | None = None):
+        self.algorithm = algorithm
+        self.start_checkpoint = start_checkpoint or BMTissueCheckpoint(
+            ambient_pressure=P_ATM.value, n2_pressures=np.full(len(algorithm.table), AIR.ppn2(P_ATM).value),
+        )
+        self.dives: list[Dive | DivePlan] = []
+        self.surface_intervals: list[Time] = []
+        self._checkpoints: list[BMTissueCheckpoint] = [] # tissue state at the end of each dive
+
+    def __len__(self) -> int:
+        return len(self.dives)
+
+    def __getitem__(self, index: int) -> Dive | DivePlan:
+        return self.dives[index]
+
+    def __setitem__(self, index: int, dive: Dive | DivePlan):
+        self.dives[index] = dive
+        del self._checkpoints[index:]
+
+    def append(self, dive: Dive | DivePlan, surface_interval: Time = T0):
+        self.dives.append(dive)
+        self.surface_intervals.append(surface_interval)
+
+    def start_checkpoint_of(self, index: int) -> BMTissueCheckpoint:
+        index = range(len(self))[index]
+        previous = self.start_checkpoint if index == 0 else self.end_checkpoint_of(index - 1)
+        return self.algorithm.surface_interval(previous, self.surface_intervals[index])
+
+    def end_checkpoint_of(self, index: int) -> BMTissueCheckpoint:
+        index = range(len(self))[index]
+        while len(self._checkpoints) <= index:
+            self._checkpoints.append(self.compartiment_profiles(len(self._checkpoints)).checkpoint())
+        return self._checkpoints[index]
+
+    def compartiment_profiles(self, index: int) -> BMCompartimentProfiles:
+        dive = self.dives[index]
+        return self.algorithm.compartiment_profiles(
+            depth_profile=dive.depth_profile, gas_usage_profile=dive.gas_usage_profile,
+            gas_supply_set=dive.start_gas_supply_set, start_checkpoint=self.start_checkpoint_of(index),
+        )
+
+    def schedule(self, bottom_plan: DivePlan, surface_interval: Time, **schedule_options) -> BMDecoSchedule:
+        # deco for a next dive after the last one in the series, earlier dives are not re-simulated
+        previous = self.end_checkpoint_of(-1) if self.dives else self.start_checkpoint
+        start = self.algorithm.surface_interval(previous, surface_interval)
+        return self.algorithm.schedule(bottom_plan, start_n2_pressure=start.start_n2_pressure, **schedule_options)
@@ -1,10 +1,14 @@
 
+from collections.abc import Iterator, Mapping
 from typing import Self
+
+import numpy as np
+
 from .depth_profile import DepthProfile
 from .gear import Cylinder
 from .physics import P_ATM, Gas, pressure_from_depth
 from .timeline import Timeline, TimeSegment
-from .quantity import VFR, Pressure, Time
+from .quantity import VFR, Depth, Pressure, Time
 
 
 class GasUsage:
@@ -21,6 +25,24 @@ class GasUsageProfile:
     def __getitem__(self, time: Time) -> GasUsage:
         return self.gas_usages[self.timeline.segment_for(time)]
 
+    def for_segment(self, segment: TimeSegment) -> GasUsage:
+        # segment boundaries belong to two segments, so look up (sub)segments by their midpoint
+        try:
+            return self.gas_usages[segment]
+        except KeyError:
+            return self[segment.start + segment.duration/2]
+
+    def segment_arrays(self, timeline: Timeline) -> tuple[np.ndarray, np.ndarray]:
+        # gas supply name and SAC of every segment of timeline at once, the vectorized form of for_segment
+        ticks = np.array(timeline.ticks)
+        midpoints = (ticks[:-1] + ticks[1:])/2
+        indices = np.maximum(np.searchsorted(self.timeline.ticks, midpoints, side='left') - 1, 0)
+        indices = np.minimum(indices, len(self.timeline) - 2)
+        gas_usages = [self.gas_usages[segment] for segment in self.timeline.segments]
+        gas_supply_names = np.array([gas_usage.gas_supply_name for gas_usage in gas_usages])
+        sacs = np.array([gas_usage.sac.value for gas_usage in gas_usages])
+        return gas_supply_names[indices], sacs[indices]
+
 
 class GasSupply:
     def __init__(self, cylinder: Cylinder, gas: Gas, pressure: Pressure):
@@ -65,10 +87,31 @@ class GasSupplySet:
         return self.consume(gas_supply_name=gas_usage.gas_supply_name, volume=volume, pressure=pressure)
         
 
+class GasSupplySets(Mapping):
+    # GasSupplySet snapshots of a GasSupplyProfile, created on access
+    def __init__(self, gas_supply_profile: 'GasSupplyProfile'):
+        self.gas_supply_profile = gas_supply_profile
+
+    def __getitem__(self, time: Time) -> GasSupplySet:
+        try:
+            index = self.gas_supply_profile.timeline.index(time)
+        except ValueError:
+            raise KeyError(time)
+        return self.gas_supply_profile.gas_supply_set_at(index)
+
+    def __iter__(self) -> Iterator[Time]:
+        return iter(self.gas_supply_profile.timeline)
+
+    def __len__(self) -> int:
+        return len(self.gas_supply_profile.timeline)
+
+
 class GasSupplyProfile:
-    def __init__(self, timeline: Timeline, gas_supply_sets: dict[Time, GasSupplySet]):
+    def __init__(self, timeline: Timeline, start_gas_supply_set: GasSupplySet, pressures: dict[str, np.ndarray]):
         self.timeline = timeline
-        self.gas_supply_sets = gas_supply_sets
+        self.start_gas_supply_set = start_gas_supply_set
+        self.pressures = pressures # cylinder pressure per gas supply at every time of the timeline
+        self.gas_supply_sets = GasSupplySets(self)
 
     def __getitem__(self, time: Time) -> GasSupplySet:
         try:
@@ -76,11 +119,28 @@ class GasSupplyProfile:
         except KeyError:
             raise NotImplementedError()
 
+    def gas_supply_set_at(self, index: int) -> GasSupplySet:
+        return GasSupplySet(**{
+            name: GasSupply(gas_supply.cylinder, gas_supply.gas, Pressure(float(self.pressures[name][index])))
+                for name, gas_supply in self.start_gas_supply_set.gas_supplies.items()
+        })
+
     @staticmethod
     def create(start_gas_supply_set: GasSupplySet, depth_profile: DepthProfile, gas_usage_profile: GasUsageProfile) -> Self:
+        # consumption of every segment at once, cylinder pressures are the cumulative sums per gas supply
         timeline = depth_profile.timeline
-        gas_supply_sets = {timeline[0]: start_gas_supply_set}
-        for segment in timeline.segments:
-            gas_supply_sets[segment.stop] = gas_supply_sets[segment.start].use_for(segment=segment, depth=depth_profile.average_depth(segment), gas_usage=gas_usage_profile[segment.start])
-        return GasSupplyProfile(timeline=timeline, gas_supply_sets=gas_supply_sets)
+        gas_supply_names, sacs = gas_usage_profile.segment_arrays(timeline)
+        pressures = GasSupplyProfile.pressures_of(start_gas_supply_set, depth_profile.values, np.diff(timeline.values), gas_supply_names, sacs)
+        return GasSupplyProfile(timeline=timeline, start_gas_supply_set=start_gas_supply_set, pressures=pressures)
 
+    @staticmethod
+    def pressures_of(
+            start_gas_supply_set: GasSupplySet, depths: np.ndarray, durations: np.ndarray, gas_supply_names: np.ndarray, sacs: np.ndarray,
+        ) -> dict[str, np.ndarray]:
+        ambient_pressures = pressure_from_depth(Depth((depths[:-1] + depths[1:])/2)).value
+        volumes_atm = sacs*durations*ambient_pressures/P_ATM.value
+        pressures = {}
+        for name, gas_supply in start_gas_supply_set.gas_supplies.items():
+            pressure_drops = np.where(gas_supply_names == name, volumes_atm*P_ATM.value/gas_supply.volume.value, 0)
+            pressures[name] = gas_supply.pressure.value - np.concatenate(([0], np.cumsum(pressure_drops)))
+        return pressures
@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Self
+
+import numpy as np
+
+from .buhlmann import BMCompartiment, Buhlmann
+from .dive_plan import DivePlan
+from .physics import depth_from_pressure
+from .quantity import Pressure
+
+
+class GFSweep:
+    def __init__(self,
+            gf_lows: np.ndarray, gf_highs: np.ndarray, times: np.ndarray, ceilings: np.ndarray,
+            first_stops: np.ndarray, pressures_gf_low: np.ndarray, deco_times: np.ndarray,
+        ):
+        self.gf_lows = gf_lows
+        self.gf_highs = gf_highs
+        self.times = times
+        self.ceilings = ceilings # (gf_low, gf_high, time) ceiling depth in m, over the bottom plan
+        self.first_stops = first_stops # (gf_low, gf_high) first stop depth in m, nan without deco
+        self.pressures_gf_low = pressures_gf_low
+        self.deco_times = deco_times # (gf_low, gf_high) total stop time in s
+
+    @staticmethod
+    def create(
+            algorithm: Buhlmann, bottom_plan: DivePlan, gf_lows: list[float], gf_highs: list[float],
+            processes: int | None = None, **schedule_options,
+        ) -> Self:
+        # tissue loading does not depend on the gradient factors, so the bottom plan is integrated only once
+        gf_lows = np.asarray(gf_lows, dtype=float)
+        gf_highs = np.asarray(gf_highs, dtype=float)
+        bottom_profiles = algorithm.bottom_profiles(bottom_plan)
+        n2_pressures = bottom_profiles.n2_pressures[:, -1]
+        tasks = [(algorithm.compartiments, gf_low, gf_highs, n2_pressures, bottom_plan, schedule_options) for gf_low in gf_lows]
+        if processes == 1:
+            results = list(map(_schedule_gf_lows, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_schedule_gf_lows, tasks))
+        first_stops, pressures_gf_low, deco_times = np.array(results).transpose(2, 0, 1)
+        ceilings = GFSweep._ceilings(algorithm, gf_lows, gf_highs, pressures_gf_low, bottom_profiles.n2_pressures)
+        return GFSweep(
+            gf_lows=gf_lows, gf_highs=gf_highs, times=bottom_profiles.times, ceilings=ceilings,
+            first_stops=first_stops, pressures_gf_low=pressures_gf_low, deco_times=deco_times,
+        )
+
+    @staticmethod
+    def _ceilings(algorithm: Buhlmann, gf_lows: np.ndarray, gf_highs: np.ndarray, pressures_gf_low: np.ndarray, n2_pressures: np.ndarray) -> np.ndarray:
+        # without deco there is no gf_low anchor, so gf_high applies at all depths
+        table = algorithm.table
+        agf = np.empty(pressures_gf_low.shape + (len(table),))
+        bgf = np.empty_like(agf)
+        for (i, j), pressure_gf_low in np.ndenumerate(pressures_gf_low):
+            if np.isnan(pressure_gf_low):
+                agf[i, j], bgf[i, j] = table.constant_gf_coefficients(gf_highs[j])
+            else:
+                agf[i, j], bgf[i, j] = table.gf_coefficients(gf_lows[i], gf_highs[j], pressure_gf_low)
+        low_agf, low_bgf = table.constant_gf_coefficients(gf_lows[:, np.newaxis])
+        # (gf_low, gf_high, time, compartiment), gf_low applies below pressure_gf_low, the gradient factor line above it
+        n2_pressures = n2_pressures.T[np.newaxis, np.newaxis]
+        line_ceiling_pressures = table.ceiling_pressures(n2_pressures, agf[:, :, np.newaxis], bgf[:, :, np.newaxis])
+        low_ceiling_pressures = table.ceiling_pressures(n2_pressures, low_agf[:, np.newaxis, np.newaxis], low_bgf[:, np.newaxis, np.newaxis])
+        ceiling_pressures = np.where(
+            low_ceiling_pressures >= pressures_gf_low[:, :, np.newaxis, np.newaxis], low_ceiling_pressures, line_ceiling_pressures,
+        ).max(axis=-1)
+        return np.maximum(depth_from_pressure(Pressure(ceiling_pressures)).value, 0)
+
+    def __getitem__(self, gf: tuple[float, float]) -> tuple[float, float]:
+        i = int(np.argmin(np.abs(self.gf_lows - gf[0])))
+        j = int(np.argmin(np.abs(self.gf_highs - gf[1])))
+        return self.first_stops[i, j], self.deco_times[i, j]
+
+
+def _schedule_gf_lows(task: tuple[list[BMCompartiment], float, np.ndarray, np.ndarray, DivePlan, dict]) -> list[tuple[float, float, float]]:
+    compartiments, gf_low, gf_highs, n2_pressures, bottom_plan, schedule_options = task
+    results = []
+    for gf_high in gf_highs:
+        schedule = Buhlmann(compartiments, gf_low=gf_low, gf_high=gf_high).schedule_from(n2_pressures, bottom_plan, **schedule_options)
+        results.append((
+            schedule.first_stop.value if schedule.first_stop is not None else np.nan,
+            schedule.pressure_gf_low.value if schedule.pressure_gf_low is not None else np.nan,
+            schedule.deco_time.value,
+        ))
+    return results
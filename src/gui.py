@@ -1,6 +1,29 @@
+import math
+
 import matplotlib.pyplot as plt
+import numpy as np
 
 from .physics import depth_from_pressure
+from .quantity import Pressure
+
+
+def decimate_min_max(x_values: np.ndarray, y_values: np.ndarray, bins: int, x_min: float = -math.inf, x_max: float = math.inf) -> tuple[np.ndarray, np.ndarray]:
+    # The samples within [x_min, x_max] reduced to the first, last, minimum and maximum sample of each of
+    # at most `bins` equally sized chunks, which draws the same envelope as the full series at that width.
+    # One sample beyond each end is kept so the line runs to the edge of the view.
+    start = max(int(np.searchsorted(x_values, x_min, side='right')) - 1, 0)
+    stop = min(int(np.searchsorted(x_values, x_max, side='left')) + 1, len(x_values))
+    count = stop - start
+    if count <= 4*bins:
+        return x_values[start:stop], y_values[start:stop]
+    chunk = -(-count//bins)
+    chunks = y_values[start:stop]
+    chunks = np.concatenate([chunks, np.full(chunk*bins - count, chunks[-1])]).reshape(bins, chunk)
+    offsets = start + chunk*np.arange(bins)
+    indices = np.concatenate([offsets, offsets + chunks.argmin(axis=1), offsets + chunks.argmax(axis=1), offsets + chunk - 1])
+    indices = np.unique(np.minimum(indices, stop - 1))
+    return x_values[indices], y_values[indices]
+
 
 class DivePlot:
     def __init__(self, dive, deco):
@@ -17,11 +40,14 @@ class DivePlot:
 
 class ProfilePlot(DivePlot):
     def _create(self):
-        time_values = [time.value/60 for time in self.dive.timeline]
-        depth_values = [self.dive.depth_profile[t].value for t in self.dive.timeline]
-        deco_values = {compartiment_name: [depth_from_pressure(state.n2_pressure).value for state in compartiment.states] for compartiment_name, compartiment in self.deco.profiles.items()}
+        time_values = np.array(self.dive.timeline.values)/60
+        depth_values = self.dive.depth_profile.values
+        deco_values = {
+            compartiment_name: depth_from_pressure(Pressure(n2_pressures)).value
+                for compartiment_name, n2_pressures in zip(self.deco.profiles, self.deco.n2_pressures)
+        }
         gas_supply_values = {
-            gas_supply_name: [self.dive.gas_supply_profile[time].gas_supplies[gas_supply_name].pressure.value/1e5 for time in self.dive.timeline]
+            gas_supply_name: self.dive.gas_supply_profile.pressures[gas_supply_name]/1e5
                 for gas_supply_name in self.dive.start_gas_supply_set.gas_supplies
         }
         self._init_plot()
@@ -31,8 +57,11 @@ class ProfilePlot(DivePlot):
 
 
 class MPLProfilePlot(ProfilePlot):
+    # Lines are drawn decimated to the pixel width of their axes. Zooming or panning re-decimates the full
+    # series for the visible range and updates the existing lines in place.
     def _init_plot(self):
-        self.fig, self.axs = plt.subplots(2)
+        self.lines = []
+        self.fig, self.axs = plt.subplots(2, sharex=True)
         self.fig.suptitle("Dive {self.dive.name}")
         tmax_value = self.dive.timeline[-1].value/60
         for ax in self.axs:
@@ -45,17 +74,31 @@ class MPLProfilePlot(ProfilePlot):
         self.axs[1].set_title("gas supply")
         self.axs[1].set_xlabel("Time [min]")
         self.axs[1].set_ylabel("cylinder pressure [bar]")
+        self.axs[0].callbacks.connect('xlim_changed', self._update_lines)
+
+    def _plot(self, ax, time_values, values, **kwargs):
+        line, = ax.plot(*decimate_min_max(time_values, values, self._bins(ax)), **kwargs)
+        self.lines.append((line, time_values, values))
+
+    def _bins(self, ax) -> int:
+        return max(int(ax.bbox.width), 1)
+
+    def _update_lines(self, ax):
+        x_min, x_max = ax.get_xlim()
+        for line, time_values, values in self.lines:
+            line.set_data(*decimate_min_max(time_values, values, self._bins(line.axes), x_min, x_max))
+        self.fig.canvas.draw_idle()
 
     def _plot_depth_profile(self, time_values, depth_values):
-        self.axs[0].plot(time_values, depth_values)
+        self._plot(self.axs[0], time_values, depth_values)
 
     def _plot_gas_supply_profile(self, time_values, gas_supply_values):
         for gas_supply_name in gas_supply_values:
-            self.axs[1].plot(time_values, gas_supply_values[gas_supply_name], label=gas_supply_name)
+            self._plot(self.axs[1], time_values, gas_supply_values[gas_supply_name], label=gas_supply_name)
 
     def _plot_deco_profile(self, time_values, deco_values):
         for compartiment_name in deco_values:
-            self.axs[0].plot(time_values, deco_values[compartiment_name], label=compartiment_name)
+            self._plot(self.axs[0], time_values, deco_values[compartiment_name], label=compartiment_name)
 
     def show(self):
         self.axs[0].legend()
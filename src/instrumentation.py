@@ -0,0 +1,141 @@
+import functools
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from .buhlmann import (
+    BMCompartiment,
+    BMCompartimentState,
+    BMCompartimentTable,
+    BMTissueStream,
+    gf_coefficients,
+)
+from .depth_profile import DepthProfile
+from .quantity import Quantity, Time
+from .timeline import Timeline
+
+QUANTITY_OPERATORS = ('__neg__', '__add__', '__radd__', '__sub__', '__mul__', '__rmul__', '__truediv__', '__rtruediv__')
+
+# (owner, attribute) pairs wrapped while instrumentation is enabled, they are left untouched otherwise
+HOT_PATHS = [
+    *((cls, name) for cls in (Quantity, Time) for name in QUANTITY_OPERATORS if name in vars(cls)),
+    (Timeline, 'index'),
+    (Timeline, 'indices'),
+    (Timeline, 'segment_for'),
+    (DepthProfile, '__getitem__'),
+    (BMCompartiment, 'agf'),
+    (BMCompartiment, 'bgf'),
+    (BMCompartimentState, 'next'),
+    (BMCompartimentTable, 'advance'),
+    (BMCompartimentTable, 'load'),
+    (BMTissueStream, 'feed'),
+]
+
+
+class HotPathStats:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        # net change of the interpreter's allocated memory blocks, nested hot paths are included
+        self.allocated_blocks = 0
+
+    def as_dict(self) -> dict:
+        return {'calls': self.calls, 'seconds': self.seconds, 'allocated_blocks': self.allocated_blocks}
+
+
+class CacheStats:
+    def __init__(self, hits: int = 0, misses: int = 0):
+        self.hits = hits
+        self.misses = misses
+
+    def as_dict(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class InstrumentationReport:
+    def __init__(self):
+        self.hot_paths: dict[str, HotPathStats] = {}
+        self.caches: dict[str, CacheStats] = {}
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'seconds': self.seconds,
+            'hot_paths': {name: stats.as_dict() for name, stats in self.hot_paths.items() if stats.calls},
+            'caches': {name: stats.as_dict() for name, stats in self.caches.items()},
+        }
+
+    def __str__(self) -> str:
+        lines = [f"{'hot path':<36} {'calls':>10} {'ms':>10} {'blocks':>10}"]
+        for name, stats in sorted(self.hot_paths.items(), key=lambda item: -item[1].seconds):
+            if stats.calls:
+                lines.append(f"{name:<36} {stats.calls:>10} {stats.seconds*1e3:>10.2f} {stats.allocated_blocks:>10}")
+        lines.append(f"{'cache':<36} {'hits':>10} {'misses':>10}")
+        for name, stats in self.caches.items():
+            lines.append(f"{name:<36} {stats.hits:>10} {stats.misses:>10}")
+        lines.append(f"total {self.seconds*1e3:.2f} ms")
+        return '\n'.join(lines)
+
+
+_report: InstrumentationReport | None = None
+
+
+def _instrumented(function: Callable, stats: HotPathStats) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.allocated_blocks += sys.getallocatedblocks() - blocks
+            stats.calls += 1
+    return wrapper
+
+
+def _depth_lookup_counted(function: Callable, stats: CacheStats) -> Callable:
+    # DepthProfile.__getitem__ interpolates on a miss of its depths mapping
+    @functools.wraps(function)
+    def wrapper(depth_profile: DepthProfile, time: Time):
+        if time in depth_profile.depths:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+        return function(depth_profile, time)
+    return wrapper
+
+
+@contextmanager
+def instrument() -> Iterator[InstrumentationReport]:
+    # Wraps the hot paths with counters, timers and allocation counts for the duration of the block and
+    # yields the report they fill. The wrappers are installed on the classes, so this is process wide and
+    # not meant to be nested or used from several threads at once.
+    global _report
+    if _report is not None:
+        raise RuntimeError("instrumentation is already enabled")
+    report = _report = InstrumentationReport()
+    depth_stats = report.caches['DepthProfile.depths'] = CacheStats()
+    originals = []
+    for owner, name in HOT_PATHS:
+        function = vars(owner)[name]
+        originals.append((owner, name, function))
+        label = f'{owner.__name__}.{name}'
+        wrapped = _instrumented(function, report.hot_paths.setdefault(label, HotPathStats()))
+        if (owner, name) == (DepthProfile, '__getitem__'):
+            wrapped = _depth_lookup_counted(wrapped, depth_stats)
+        setattr(owner, name, wrapped)
+    cache_info = gf_coefficients.cache_info()
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.seconds = time.perf_counter() - start
+        end_cache_info = gf_coefficients.cache_info()
+        report.caches['gf_coefficients'] = CacheStats(
+            hits=end_cache_info.hits - cache_info.hits, misses=end_cache_info.misses - cache_info.misses,
+        )
+        for owner, name, function in originals:
+            setattr(owner, name, function)
+        _report = None
@@ -0,0 +1,167 @@
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .buhlmann import BMTissueCheckpoint, Buhlmann
+from .columnar import DiveColumns
+from .dive import Dive
+from .dive_evaluation import DiveEvaluation
+from .dive_plan import DivePlan
+from .quantity import Time
+
+
+class LogbookEntry:
+    def __init__(self,
+            dive_id: str, date: datetime, max_depth_m: float, runtime: Time, gases: list[str], max_he_fraction: float,
+            peak_gradient_factor: float, pressure_gf_low: float | None, end_checkpoint: BMTissueCheckpoint,
+        ):
+        self.dive_id = dive_id
+        self.date = date
+        self.max_depth_m = max_depth_m
+        self.runtime = runtime
+        self.gases = gases # gases breathed during the dive
+        self.max_he_fraction = max_he_fraction
+        self.peak_gradient_factor = peak_gradient_factor # highest gradient factor of the leading compartiment
+        self.pressure_gf_low = pressure_gf_low
+        self.end_checkpoint = end_checkpoint
+
+    def __str__(self) -> str:
+        return f"{self.dive_id} {self.date:%Y-%m-%d %H:%M} {self.max_depth_m:.1f}m {self.runtime} {'/'.join(self.gases)} GF {self.peak_gradient_factor:.2f}"
+
+
+class Logbook:
+    # Dives stored as DiveColumns files next to one summary index. Queries only read the index, which is
+    # loaded into memory as one array per summary column; the dive files are mapped when a dive is opened.
+    INDEX_FILE = 'index.npz'
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            with np.load(self.directory/self.INDEX_FILE, allow_pickle=False) as index:
+                self.index: dict[str, np.ndarray] = {name: index[name] for name in index.files}
+        except FileNotFoundError:
+            self.index = {}
+        self._pending: list[dict] = [] # rows added since the index arrays were last built
+        self._dive_ids = set(self.index['dive_ids'].tolist()) if self.index else set()
+
+    def __len__(self) -> int:
+        return len(self._dive_ids)
+
+    def __contains__(self, dive_id: str) -> bool:
+        return dive_id in self._dive_ids
+
+    def add(self,
+            algorithm: Buhlmann, dive: Dive | DivePlan, date: datetime, dive_id: str | None = None,
+            sample_period: Time | None = None, start_checkpoint: BMTissueCheckpoint | None = None,
+        ) -> str:
+        # evaluates the dive once, writes its columns and queues its summary row, call save() to persist the index
+        dive = dive.dive if isinstance(dive, DivePlan) else dive
+        dive_id = f"{date:%Y%m%dT%H%M%S}" if dive_id is None else dive_id
+        if dive_id in self:
+            raise ValueError(f"The logbook already contains a dive {dive_id}.")
+        evaluation = DiveEvaluation.create(algorithm, dive, sample_period=sample_period, start_checkpoint=start_checkpoint)
+        DiveColumns.write(self.directory/f"{dive_id}.col", evaluation)
+        self._pending.append(self._summary(algorithm, dive, evaluation, dive_id, date))
+        self._dive_ids.add(dive_id)
+        return dive_id
+
+    @staticmethod
+    def _summary(algorithm: Buhlmann, dive: Dive, evaluation: DiveEvaluation, dive_id: str, date: datetime) -> dict:
+        table = algorithm.table
+        ambient_pressures = evaluation.ambient_pressures
+        gradient_factors = (evaluation.n2_pressures.T - ambient_pressures[:, np.newaxis])/(table.a + ambient_pressures[:, np.newaxis]/table.b - ambient_pressures[:, np.newaxis])
+        gas_supplies = dive.start_gas_supply_set.gas_supplies
+        gases = [gas_supplies[name].gas for name in dict.fromkeys(evaluation.gas_supply_names.tolist())]
+        gas_names = dict.fromkeys(str(gas) for gas in gases)
+        checkpoint = evaluation.checkpoint()
+        pressure_gf_low = evaluation.pressure_gf_low
+        return {
+            'dive_ids': dive_id,
+            'dates': np.datetime64(date, 's'),
+            'max_depths_m': float(evaluation.depths.max()),
+            'runtimes_s': float(evaluation.times[-1] - evaluation.times[0]),
+            'gases': ','.join(gas_names),
+            'max_he_fractions': max((gas.he for gas in gases), default=0.0),
+            'peak_gradient_factors': float(gradient_factors.max()),
+            'pressures_gf_low': np.nan if pressure_gf_low is None else pressure_gf_low.value,
+            'end_ambient_pressures': checkpoint.ambient_pressure,
+            'end_n2_pressures': checkpoint.n2_pressures,
+        }
+
+    @property
+    def _columns(self) -> dict[str, np.ndarray]:
+        if self._pending:
+            columns = {name: np.array([row[name] for row in self._pending]) for name in self._pending[0]}
+            self.index = columns if not self.index else {name: np.concatenate([self.index[name], columns[name]]) for name in columns}
+            self._pending = []
+        return self.index
+
+    def save(self):
+        # written to a temporary file first, so an interrupted save keeps the previous index
+        file, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file, 'wb') as stream:
+                np.savez(stream, **self._columns)
+            os.replace(temporary_path, self.directory/self.INDEX_FILE)
+        except BaseException:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+
+    def query(self,
+            min_depth_m: float | None = None, max_depth_m: float | None = None, trimix: bool | None = None, gas: str | None = None,
+            min_peak_gradient_factor: float | None = None, since: datetime | None = None, until: datetime | None = None,
+        ) -> list[str]:
+        # ids of the dives matching every given filter, in date order, answered from the index alone
+        columns = self._columns
+        if not columns:
+            return []
+        mask = np.ones(len(columns['dive_ids']), dtype=bool)
+        if min_depth_m is not None:
+            mask &= columns['max_depths_m'] >= min_depth_m
+        if max_depth_m is not None:
+            mask &= columns['max_depths_m'] <= max_depth_m
+        if trimix is not None:
+            mask &= (columns['max_he_fractions'] > 0) == trimix
+        if gas is not None:
+            mask &= np.char.find(np.char.add(np.char.add(',', columns['gases']), ','), f",{gas},") >= 0
+        if min_peak_gradient_factor is not None:
+            mask &= columns['peak_gradient_factors'] >= min_peak_gradient_factor
+        if since is not None:
+            mask &= columns['dates'] >= np.datetime64(since, 's')
+        if until is not None:
+            mask &= columns['dates'] <= np.datetime64(until, 's')
+        indices = np.flatnonzero(mask)
+        indices = indices[np.argsort(columns['dates'][indices], kind='stable')]
+        return columns['dive_ids'][indices].tolist()
+
+    def _row(self, dive_id: str) -> int:
+        rows = np.flatnonzero(self._columns.get('dive_ids', np.array([])) == dive_id)
+        if not len(rows):
+            raise KeyError(dive_id)
+        return int(rows[0])
+
+    def __getitem__(self, dive_id: str) -> LogbookEntry:
+        row = self._row(dive_id)
+        columns = self._columns
+        pressure_gf_low = float(columns['pressures_gf_low'][row])
+        return LogbookEntry(
+            dive_id=dive_id,
+            date=columns['dates'][row].astype(datetime),
+            max_depth_m=float(columns['max_depths_m'][row]),
+            runtime=Time(float(columns['runtimes_s'][row])),
+            gases=str(columns['gases'][row]).split(','),
+            max_he_fraction=float(columns['max_he_fractions'][row]),
+            peak_gradient_factor=float(columns['peak_gradient_factors'][row]),
+            pressure_gf_low=None if np.isnan(pressure_gf_low) else pressure_gf_low,
+            end_checkpoint=BMTissueCheckpoint(
+                ambient_pressure=float(columns['end_ambient_pressures'][row]), n2_pressures=columns['end_n2_pressures'][row].copy(),
+            ),
+        )
+
+    def columns(self, dive_id: str) -> DiveColumns:
+        self._row(dive_id)
+        return DiveColumns.open(self.directory/f"{dive_id}.col")
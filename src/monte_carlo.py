@@ -0,0 +1,126 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .buhlmann import BMCompartiment, Buhlmann
+from .dive_plan import DivePlan, DivePlanRow
+from .physics import AIR, P_ATM, pressure_from_depth
+from .quantity import Depth
+
+
+class PlanPerturbation:
+    def __init__(self, sac_sigma: float = 0.2, depth_sigma_m: float = 1.0, overrun_mean_min: float = 2.0):
+        self.sac_sigma = sac_sigma # log-normal spread of a SAC factor applied to every row
+        self.depth_sigma_m = depth_sigma_m # normal spread of a depth offset applied to every row below the surface
+        self.overrun_mean_min = overrun_mean_min # mean of an exponential overrun of the deepest row
+
+    def sample(self, rng: np.random.Generator, samples: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        sac_factors = rng.lognormal(mean=0, sigma=self.sac_sigma, size=samples) if self.sac_sigma else np.ones(samples)
+        depth_offsets_m = rng.normal(scale=self.depth_sigma_m, size=samples) if self.depth_sigma_m else np.zeros(samples)
+        overruns_min = rng.exponential(scale=self.overrun_mean_min, size=samples) if self.overrun_mean_min else np.zeros(samples)
+        return sac_factors, depth_offsets_m, overruns_min
+
+
+class MonteCarloResult:
+    def __init__(self,
+            sac_factors: np.ndarray, depth_offsets_m: np.ndarray, overruns_min: np.ndarray,
+            end_pressures: dict[str, np.ndarray], first_stops: np.ndarray, deco_times: np.ndarray,
+        ):
+        self.sac_factors = sac_factors
+        self.depth_offsets_m = depth_offsets_m
+        self.overruns_min = overruns_min
+        self.end_pressures = end_pressures # cylinder pressure per gas supply at the surface, per sample
+        self.first_stops = first_stops # first stop depth in m per sample, nan without deco
+        self.deco_times = deco_times # total stop time in s per sample
+
+    def __len__(self) -> int:
+        return len(self.deco_times)
+
+    def end_pressure_percentiles(self, percentiles: list[float]) -> dict[str, np.ndarray]:
+        return {name: np.percentile(pressures, percentiles) for name, pressures in self.end_pressures.items()}
+
+    def deco_time_percentiles(self, percentiles: list[float]) -> np.ndarray:
+        return np.percentile(self.deco_times, percentiles)
+
+    def __str__(self) -> str:
+        percentiles = [5, 50, 95]
+        lines = [f"{len(self)} samples, percentiles {' / '.join(map(str, percentiles))}"]
+        for name, pressures in self.end_pressure_percentiles(percentiles).items():
+            lines.append(f"{name}: {' / '.join(f'{pressure/1e5:.0f}' for pressure in pressures)} bar")
+        lines.append(f"deco obligation: {' / '.join(f'{deco_time/60:.0f}' for deco_time in self.deco_time_percentiles(percentiles))} min")
+        return '\n'.join(lines)
+
+
+class MonteCarlo:
+    @staticmethod
+    def run(
+            algorithm: Buhlmann, bottom_plan: DivePlan, samples: int = 10000, perturbation: PlanPerturbation | None = None,
+            seed: int | None = None, batch_size: int = 1000, processes: int | None = None, **schedule_options,
+        ) -> MonteCarloResult:
+        # The perturbations are drawn up front so a seed reproduces the result for any batching. Each batch
+        # integrates the tissues and gas consumption of the bottom plan for all its samples at once, the ascent
+        # is scheduled per sample from the end state and its gas consumption added.
+        if perturbation is None:
+            perturbation = PlanPerturbation()
+        sac_factors, depth_offsets_m, overruns_min = perturbation.sample(np.random.default_rng(seed), samples)
+        tasks = [
+            (algorithm.compartiments, algorithm.gf_low, algorithm.gf_high, bottom_plan,
+                sac_factors[start:start + batch_size], depth_offsets_m[start:start + batch_size], overruns_min[start:start + batch_size], schedule_options)
+                for start in range(0, samples, batch_size)
+        ]
+        if processes == 1:
+            results = list(map(_run_batch, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_run_batch, tasks))
+        return MonteCarloResult(
+            sac_factors=sac_factors, depth_offsets_m=depth_offsets_m, overruns_min=overruns_min,
+            end_pressures={name: np.concatenate([end_pressures[name] for end_pressures, _, _ in results]) for name in bottom_plan.start_gas_supply_set.gas_supplies},
+            first_stops=np.concatenate([first_stops for _, first_stops, _ in results]),
+            deco_times=np.concatenate([deco_times for _, _, deco_times in results]),
+        )
+
+
+def _run_batch(task: tuple[list[BMCompartiment], float, float, DivePlan, np.ndarray, np.ndarray, np.ndarray, dict]) -> tuple[dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    compartiments, gf_low, gf_high, bottom_plan, sac_factors, depth_offsets_m, overruns_min, schedule_options = task
+    algorithm = Buhlmann(compartiments, gf_low=gf_low, gf_high=gf_high)
+    table = algorithm.table
+    gas_supply_set = bottom_plan.start_gas_supply_set
+    rows = bottom_plan.rows
+    base_depths = np.array([row.depth.value for row in rows])
+    deepest_row = len(rows) - 1 - int(np.argmax(base_depths[::-1]))
+    # (sample, row) perturbed plans, row i's gas and SAC apply to the segment that follows it
+    depths = np.where(base_depths > 0, np.maximum(base_depths + depth_offsets_m[:, None], 0), 0)
+    durations = np.tile([row.duration.value for row in rows], (len(sac_factors), 1))
+    durations[:, deepest_row] += overruns_min*60
+    sacs = np.array([row.sac.value for row in rows])*sac_factors[:, None]
+    ambient_pressures = pressure_from_depth(Depth(depths)).value
+    pressure_drops = {name: np.zeros(len(sac_factors)) for name in gas_supply_set.gas_supplies}
+    n2_pressures = np.full((len(sac_factors), len(table)), AIR.ppn2(P_ATM).value)
+    for i, row in enumerate(rows[:-1]):
+        duration = durations[:, i + 1]
+        if not np.any(duration):
+            continue
+        gas_supply = gas_supply_set[row.gas_supply_name]
+        n2_pressures = table.advance(
+            n2_pressures, duration[:, None], ambient_pressures[:, i, None], ambient_pressures[:, i + 1, None], gas_supply.gas.n2,
+        )
+        average_ambient_pressures = (ambient_pressures[:, i] + ambient_pressures[:, i + 1])/2
+        pressure_drops[row.gas_supply_name] += sacs[:, i]*duration*average_ambient_pressures/gas_supply.volume.value
+    first_stops = np.full(len(sac_factors), np.nan)
+    deco_times = np.zeros(len(sac_factors))
+    last_row = rows[-1]
+    for n in range(len(sac_factors)):
+        end_plan = DivePlan(gas_supply_set, [DivePlanRow(depths[n, -1], 0, last_row.gas_supply_name, sacs[n, -1]*60e3)])
+        schedule = algorithm.schedule_from(n2_pressures[n], end_plan, **schedule_options)
+        if schedule.first_stop is not None:
+            first_stops[n] = schedule.first_stop.value
+        deco_times[n] = schedule.deco_time.value
+        previous = end_plan.rows[0]
+        for row in schedule.rows:
+            average_ambient_pressure = pressure_from_depth((previous.depth + row.depth)/2).value
+            gas_supply = gas_supply_set[previous.gas_supply_name]
+            pressure_drops[previous.gas_supply_name][n] += previous.sac.value*row.duration.value*average_ambient_pressure/gas_supply.volume.value
+            previous = row
+    end_pressures = {name: gas_supply_set[name].pressure.value - pressure_drops[name] for name in gas_supply_set.gas_supplies}
+    return end_pressures, first_stops, deco_times
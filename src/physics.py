@@ -39,6 +39,7 @@ D_H2O = Density(1e3)
 G = Acceleration(9.81)
 P_ATM = Pressure(1013e2)
 P_ALV_H2O = Pressure(6270)
+PPN2_ATM = AIR.ppn2(P_ATM)
 
 
 def pressure_from_depth(depth: Depth) -> Pressure:
@@ -0,0 +1,112 @@
+import numpy as np
+
+from .buhlmann import BMDecoSchedule, BMTissueCheckpoint, Buhlmann
+from .dive_plan import DivePlan, DivePlanRow
+from .physics import AIR, P_ATM, pressure_from_depth
+from .quantity import Pressure
+
+
+class DivePlanEditor:
+    # keeps tissue and gas state at every row boundary, an edit only recomputes from the edited row on
+    def __init__(self, dive_plan: DivePlan, algorithm: Buhlmann, start_checkpoint: BMTissueCheckpoint | None = None):
+        self.start_gas_supply_set = dive_plan.start_gas_supply_set
+        self.rows = list(dive_plan.rows)
+        self.algorithm = algorithm
+        self.start_checkpoint = start_checkpoint or BMTissueCheckpoint(
+            ambient_pressure=P_ATM.value, n2_pressures=np.full(len(algorithm.table), AIR.ppn2(P_ATM).value),
+        )
+        self.gas_supply_names = list(self.start_gas_supply_set.gas_supplies)
+        self._tissue_checkpoints: list[BMTissueCheckpoint] = []
+        self._gas_pressures: list[np.ndarray] = []
+        self._pressures_gf_low: list[float | None] = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> DivePlanRow:
+        return self.rows[index]
+
+    def __setitem__(self, index: int, row: DivePlanRow):
+        index = range(len(self))[index]
+        self.rows[index] = row
+        self._invalidate(index)
+
+    def __delitem__(self, index: int):
+        index = range(len(self))[index]
+        del self.rows[index]
+        self._invalidate(index)
+
+    def insert(self, index: int, row: DivePlanRow):
+        self.rows.insert(index, row)
+        self._invalidate(min(index, len(self) - 1))
+
+    def append(self, row: DivePlanRow):
+        self.insert(len(self), row)
+
+    def update(self, index: int, depth_m: float | None = None, duration_min: float | None = None, gas_supply_name: str | None = None, sac_lmin: float | None = None):
+        row = self[index]
+        self[index] = DivePlanRow(
+            depth_m=row.depth.value if depth_m is None else depth_m,
+            duration_min=row.duration.value/60 if duration_min is None else duration_min,
+            gas_supply_name=row.gas_supply_name if gas_supply_name is None else gas_supply_name,
+            sac_lmin=row.sac.value*60e3 if sac_lmin is None else sac_lmin,
+        )
+
+    def _invalidate(self, index: int):
+        del self._tissue_checkpoints[index:]
+        del self._gas_pressures[index:]
+        del self._pressures_gf_low[index:]
+
+    @property
+    def dive_plan(self) -> DivePlan:
+        return DivePlan(self.start_gas_supply_set, list(self.rows))
+
+    def tissue_checkpoint(self, index: int) -> BMTissueCheckpoint:
+        self._update(index)
+        return self._tissue_checkpoints[index]
+
+    def gas_pressures(self, index: int) -> dict[str, Pressure]:
+        self._update(index)
+        return {name: Pressure(float(pressure)) for name, pressure in zip(self.gas_supply_names, self._gas_pressures[index])}
+
+    def pressure_gf_low(self, index: int = -1) -> Pressure | None:
+        self._update(index)
+        pressure_gf_low = self._pressures_gf_low[index]
+        return Pressure(pressure_gf_low) if pressure_gf_low is not None else None
+
+    def schedule(self, **schedule_options) -> BMDecoSchedule:
+        # ascent from the last row, treating all rows as the bottom part
+        return self.algorithm.schedule_from(self.tissue_checkpoint(-1).n2_pressures, self.dive_plan, **schedule_options)
+
+    def _update(self, index: int):
+        index = range(len(self))[index]
+        table = self.algorithm.table
+        if not self._tissue_checkpoints:
+            self._tissue_checkpoints.append(self.start_checkpoint)
+            self._gas_pressures.append(np.array([self.start_gas_supply_set[name].pressure.value for name in self.gas_supply_names]))
+            self._pressures_gf_low.append(self._exceeded_gf_low(self.start_checkpoint, None))
+        while len(self._tissue_checkpoints) <= index:
+            k = len(self._tissue_checkpoints)
+            previous_row, row = self.rows[k - 1], self.rows[k]
+            previous = self._tissue_checkpoints[k - 1]
+            ambient_pressure = pressure_from_depth(row.depth).value
+            duration = row.duration.value
+            gas_supply = self.start_gas_supply_set[previous_row.gas_supply_name]
+            checkpoint = BMTissueCheckpoint(
+                ambient_pressure=ambient_pressure,
+                n2_pressures=table.advance(previous.n2_pressures, duration, previous.ambient_pressure, ambient_pressure, gas_supply.gas.n2),
+            )
+            average_ambient_pressure = (pressure_from_depth(previous_row.depth).value + ambient_pressure)/2
+            gas_pressures = self._gas_pressures[k - 1].copy()
+            gas_pressures[self.gas_supply_names.index(previous_row.gas_supply_name)] -= previous_row.sac.value*duration*average_ambient_pressure/gas_supply.volume.value
+            self._tissue_checkpoints.append(checkpoint)
+            self._gas_pressures.append(gas_pressures)
+            self._pressures_gf_low.append(self._exceeded_gf_low(checkpoint, self._pressures_gf_low[k - 1]))
+
+    def _exceeded_gf_low(self, checkpoint: BMTissueCheckpoint, pressure_gf_low: float | None) -> float | None:
+        # running max of the ambient pressure at which a compartiment exceeded gf_low
+        table = self.algorithm.table
+        if (pressure_gf_low is None or checkpoint.ambient_pressure > pressure_gf_low) and np.any(
+                checkpoint.n2_pressures > table.tolerated_pressures(checkpoint.ambient_pressure, self.algorithm.gf_low)):
+            return checkpoint.ambient_pressure
+        return pressure_gf_low
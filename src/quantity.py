@@ -1,66 +1,85 @@
-
-from functools import cache
 import math
-from typing import Self
+from typing import ClassVar, Self
 
 
 class Unit:
 
     base_units = ['m', 'kg', 's'] #add others
 
+    units: ClassVar[dict[tuple[int, ...], 'Unit']] = {} # interned units by powers of base units
+
+    quantity_types: ClassVar[dict['Unit', type]] = {} # unit -> Quantity subclass dispatch table
+
     def __init__(self, **base_units):
         non_base_units = [unit for unit in base_units if unit not in Unit.base_units]
         if non_base_units:
             raise ValueError(f"Ivalid base unit(s): {non_base_units}.")
         self.base_units = base_units
+        self.powers = tuple(base_units.get(base_unit, 0) for base_unit in Unit.base_units)
+        self.dimensionless = not any(self.powers)
+        self._hash = hash(self.powers)
+        self._products = {}
 
     def __hash__(self):
-        return hash(tuple(self.base_units.items()))
+        return self._hash
         
     def __eq__(self, other):
-        return all(self[base_unit] == other[base_unit] for base_unit in Unit.base_units)
+        return self is other or self.powers == other.powers
 
     def __getitem__(self, base_unit):
         return self.base_units[base_unit]
 
     def quantity(self, value):
-        if not any(self.base_units.values()):
+        if self.dimensionless:
             return value
-        for QuantityType in Quantity.__subclasses__():
-            if QuantityType is not UndefinedQuantity and QuantityType.unit == self:
-                return QuantityType(value)
-        return UndefinedQuantity(value, unit=self)
+        QuantityType = Unit.quantity_types.get(self)
+        if QuantityType is None:
+            return UndefinedQuantity(value, unit=self)
+        return QuantityType(value)
     
     def __str__(self):
         return '*'.join(symbol if power == 1 else f"{symbol}^{power}" for symbol, power in self.base_units.items() if power)
 
-    @cache
     @staticmethod
     def make(**base_units):
-        defaults = {base_unit: 0 for base_unit in Unit.base_units}
-        return Unit(**dict(defaults, **base_units))
-    
-    @cache
+        powers = tuple(base_units.get(base_unit, 0) for base_unit in Unit.base_units)
+        return Unit._intern(powers)
+
     @staticmethod
-    def _make(**base_units):
-        return Unit(**base_units)
+    def _intern(powers: tuple[int, ...]):
+        try:
+            return Unit.units[powers]
+        except KeyError:
+            unit = Unit.units[powers] = Unit(**dict(zip(Unit.base_units, powers)))
+            return unit
     
     def __invert__(self):
-        base_units = {base_unit: - self[base_unit] for base_unit in Unit.base_units}
-        return Unit.make(**base_units)
+        return Unit._intern(tuple(-power for power in self.powers))
     
     def __mul__(self, other):
-        base_units = {base_unit: self[base_unit] + other[base_unit] for base_unit in Unit.base_units}
-        return Unit.make(**base_units)
+        try:
+            return self._products[other.powers]
+        except KeyError:
+            unit = self._products[other.powers] = Unit._intern(tuple(power + other_power for power, other_power in zip(self.powers, other.powers)))
+            return unit
     
     def __truediv__(self, other):
         return self*~other
 
 
 class Quantity:
+
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        unit = cls.__dict__.get('unit')
+        if isinstance(unit, Unit):
+            Unit.quantity_types.setdefault(unit, cls)
+
     def __hash__(self):
         return hash((self.value, self.unit))
 
@@ -75,7 +94,7 @@ class Quantity:
         return self.unit.quantity(-self.value)
     
     def __add__(self, other: Self) -> Self:
-        if other is 0:
+        if type(other) is int and other == 0:
             return self
         if self.unit != other.unit:
             raise TypeError("Can only add quantities of same type together")
@@ -85,30 +104,24 @@ class Quantity:
         return self + other
     
     def __sub__(self, other: Self) -> Self:
-        return self + -other
+        if type(other) is int and other == 0:
+            return self
+        if self.unit != other.unit:
+            raise TypeError("Can only add quantities of same type together")
+        return self.unit.quantity(self.value - other.value)
     
     def __mul__(self, other: int | float | Self) -> Self:
         if isinstance(other, (int, float)):
-            unit = self.unit
-            value = self.value*other
-        else:
-            unit = self.unit*other.unit
-            value = self.value*other.value
-        return unit.quantity(value)
+            return self.unit.quantity(self.value*other)
+        return (self.unit*other.unit).quantity(self.value*other.value)
     
     def __rmul__(self, other: int | float) -> Self:
         return self*other
     
     def __truediv__(self, other: int | float | Self) -> Self:
         if isinstance(other, (int, float)):
-            unit = self.unit
-            value = self.value/other
-        else:
-            unit = self.unit/other.unit
-            value = self.value/other.value
-        # if not any(unit.base_units.values()):
-        #     return value
-        return unit.quantity(value)
+            return self.unit.quantity(self.value/other)
+        return (self.unit/other.unit).quantity(self.value/other.value)
     
     def __rtruediv__(self, other: int | float) -> Self:
         if not isinstance(other, (int, float)):
@@ -131,26 +144,28 @@ class Quantity:
     def __lt__(self, other: Self) -> bool:
         if self.unit != other.unit:
             raise TypeError()
-        return self.value < other.value and self != other
+        return self.value < other.value and not math.isclose(self.value, other.value)
     
     def __le__(self, other: Self) -> bool:
         if self.unit != other.unit:
             raise TypeError()
-        return self.value <= other.value or self == other
+        return self.value <= other.value or math.isclose(self.value, other.value)
     
     def __gt__(self, other: Self) -> bool:
         if self.unit != other.unit:
             raise TypeError()
-        return self.value > other.value and self != other
+        return self.value > other.value and not math.isclose(self.value, other.value)
     
     def __ge__(self, other: Self) -> bool:
         if self.unit != other.unit:
             raise TypeError()
-        return self.value >= other.value or self == other
+        return self.value >= other.value or math.isclose(self.value, other.value)
     
 
 class UndefinedQuantity(Quantity):
 
+    __slots__ = ('unit',)
+
     fmt_scale = 1
 
     def __init__(self, value, unit):
@@ -164,37 +179,106 @@ class UndefinedQuantity(Quantity):
 
 class Time(Quantity):
 
+    # integer milliseconds, so equal times hash equal and resampling stays exact
+    __slots__ = ('ms',)
+
     unit = Unit.make(s=1)
 
     fmt_unit = 's'
 
     fmt_scale = 1
 
+    ms_per_sec = 1000
+
     sec_per_min = 60
 
     min_per_hour = 60
 
     def __init__(self, sec=0, min=0, hour=0):
-        self.value = sec + Time.sec_per_min*(min + Time.min_per_hour*hour)
+        self.ms = round(Time.ms_per_sec*(sec + Time.sec_per_min*(min + Time.min_per_hour*hour)))
 
     @staticmethod
     def create(sec, min=0, hour=0) -> Self:
         return Time(sec + Time.sec_per_min*(min + Time.min_per_hour*hour))
 
+    @staticmethod
+    def from_ms(ms: int) -> Self:
+        time = Time.__new__(Time)
+        time.ms = ms
+        return time
+
+    def __reduce__(self):
+        return Time.from_ms, (self.ms,)
+
+    @property
+    def value(self) -> float:
+        return self.ms/Time.ms_per_sec
+
     @property
     def sec(self) -> int:
-        return int(self.value%Time.sec_per_min)
+        return (self.ms//Time.ms_per_sec)%Time.sec_per_min
     
     @property
     def min(self) -> int:
-        return int((self.value//Time.sec_per_min)%Time.min_per_hour)
+        return (self.ms//(Time.ms_per_sec*Time.sec_per_min))%Time.min_per_hour
     
     @property
     def hour(self) -> int:
-        return int(self.value//(Time.sec_per_min*Time.min_per_hour))
+        return self.ms//(Time.ms_per_sec*Time.sec_per_min*Time.min_per_hour)
+
+    def __hash__(self):
+        return hash(self.ms)
+
+    def __neg__(self) -> Self:
+        return Time.from_ms(-self.ms)
+
+    def __add__(self, other: Self) -> Self:
+        if type(other) is Time:
+            return Time.from_ms(self.ms + other.ms)
+        return Quantity.__add__(self, other)
+
+    def __sub__(self, other: Self) -> Self:
+        if type(other) is Time:
+            return Time.from_ms(self.ms - other.ms)
+        return Quantity.__sub__(self, other)
+
+    def __mul__(self, other: float | Quantity) -> Self:
+        if type(other) is int:
+            return Time.from_ms(self.ms*other)
+        return Quantity.__mul__(self, other)
+
+    def __truediv__(self, other: float | Quantity) -> Self:
+        if type(other) is Time:
+            return self.ms/other.ms
+        return Quantity.__truediv__(self, other)
+
+    def __eq__(self, other: Self) -> bool:
+        if type(other) is not Time:
+            return Quantity.__eq__(self, other)
+        return self.ms == other.ms
+
+    def __lt__(self, other: Self) -> bool:
+        if type(other) is not Time:
+            return Quantity.__lt__(self, other)
+        return self.ms < other.ms
+
+    def __le__(self, other: Self) -> bool:
+        if type(other) is not Time:
+            return Quantity.__le__(self, other)
+        return self.ms <= other.ms
+
+    def __gt__(self, other: Self) -> bool:
+        if type(other) is not Time:
+            return Quantity.__gt__(self, other)
+        return self.ms > other.ms
+
+    def __ge__(self, other: Self) -> bool:
+        if type(other) is not Time:
+            return Quantity.__ge__(self, other)
+        return self.ms >= other.ms
 
     def __str__(self) -> str:
-        if self.value < 0:
+        if self.ms < 0:
             return f"-{-self}"
         else:
             return f"{self.hour}:{self.min:0>2}:{self.sec:0>2}"
@@ -204,34 +288,52 @@ T0 = Time(0)
     
 
 class Depth(Quantity):
+
+    __slots__ = ()
+
     unit = Unit.make(m=1)
 
 
 class Volume(Quantity):
+
+    __slots__ = ()
+
     unit = Unit.make(m=3)
     fmt_unit = 'l'
     fmt_scale = 1e3
 
 
 class VFR(Quantity):
+
+    __slots__ = ()
+
     unit = Unit.make(m=3, s=-1)
     fmt_unit = 'l/min'
     fmt_scale = 60e3
 
 
 class Pressure(Quantity):
+
+    __slots__ = ()
+
     unit = Unit.make(m=-1, kg=1, s=-2)
     fmt_unit = 'bar'
     fmt_scale = 1e-5
 
 
 class Density(Quantity):
+
+    __slots__ = ()
+
     unit = Unit.make(m=-3, kg=1)
     fmt_unit = 'kg/m³'
     fmt_scale = 1
 
 
 class Acceleration(Quantity):
+
+    __slots__ = ()
+
     unit = Unit.make(m=1, s=-2)
     fmt_unit = 'm/s²'
     fmt_scale = 1
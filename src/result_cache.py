@@ -0,0 +1,141 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from .buhlmann import BMCompartimentProfiles, BMTissueCheckpoint, Buhlmann
+from .dive import Dive
+from .dive_evaluation import DiveEvaluation
+from .dive_plan import DivePlan
+from .quantity import Time
+from .timeline import Timeline
+
+CACHE_FORMAT_VERSION = 1
+
+
+class DiveResultCache:
+    # DiveEvaluations on disk, one .npz file per content hash of everything the evaluation depends on.
+    # Hits refresh the file's modification time and the least recently used files are evicted beyond max_bytes.
+    def __init__(self, directory: str | os.PathLike, max_bytes: int = 1 << 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = self.size
+
+    def evaluate(self,
+            algorithm: Buhlmann, dive: Dive | DivePlan, sample_period: Time | None = None,
+            start_checkpoint: BMTissueCheckpoint | None = None,
+        ) -> DiveEvaluation:
+        dive = dive.dive if isinstance(dive, DivePlan) else dive
+        path = self.directory/f"{self.key(algorithm, dive, sample_period, start_checkpoint)}.npz"
+        try:
+            evaluation = self._load(path, algorithm, dive, sample_period)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            # missing, or left unreadable by an interrupted or older writer, either way it is recomputed
+            evaluation = None
+        if evaluation is not None:
+            self.hits += 1
+            os.utime(path)
+            return evaluation
+        self.misses += 1
+        evaluation = DiveEvaluation.create(algorithm, dive, sample_period=sample_period, start_checkpoint=start_checkpoint)
+        self._store(path, evaluation)
+        self._size += path.stat().st_size
+        if self._size > self.max_bytes:
+            self._evict()
+        return evaluation
+
+    @staticmethod
+    def key(algorithm: Buhlmann, dive: Dive, sample_period: Time | None = None, start_checkpoint: BMTissueCheckpoint | None = None) -> str:
+        digest = hashlib.sha256()
+
+        def update(*parts):
+            for part in parts:
+                if isinstance(part, np.ndarray):
+                    digest.update(np.ascontiguousarray(part, dtype='<f8').tobytes())
+                else:
+                    digest.update(repr(part).encode())
+                digest.update(b'\0')
+
+        table = algorithm.table
+        update(CACHE_FORMAT_VERSION, algorithm.gf_low, algorithm.gf_high, algorithm.exact, table.halftimes, table.a, table.b)
+        update(np.array(dive.timeline.ticks), dive.depth_profile.values)
+        gas_supply_names, sacs = dive.gas_usage_profile.segment_arrays(dive.timeline)
+        update(gas_supply_names.tolist(), sacs)
+        for name, gas_supply in dive.start_gas_supply_set.gas_supplies.items():
+            update(name, gas_supply.gas.o2, gas_supply.gas.he, gas_supply.volume.value, gas_supply.pressure.value)
+        update(None if sample_period is None else sample_period.ms)
+        update(None if start_checkpoint is None else start_checkpoint.to_bytes())
+        return digest.hexdigest()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob('*.npz'))
+
+    @property
+    def size(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.glob('*.npz'))
+
+    def clear(self):
+        for path in self.directory.glob('*.npz'):
+            path.unlink(missing_ok=True)
+        self._size = 0
+
+    def _store(self, path: Path, evaluation: DiveEvaluation):
+        # written to a temporary file first, so concurrent readers never see a partial entry
+        arrays = {
+            'ticks': np.array(evaluation.timeline.ticks, dtype=np.int64),
+            'depths': evaluation.depths,
+            'ambient_pressures': evaluation.ambient_pressures,
+            'gas_supply_names': evaluation.gas_supply_names.astype(str),
+            'sacs': evaluation.sacs,
+            'n2_pressures': evaluation.n2_pressures,
+            'pressure_gf_low': np.array(np.nan if evaluation.pressure_gf_low is None else evaluation.pressure_gf_low.value),
+            **{f'cylinder_pressures/{name}': pressures for name, pressures in evaluation.cylinder_pressures.items()},
+        }
+        file, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file, 'wb') as stream:
+                np.savez(stream, **arrays)
+            os.replace(temporary_path, path)
+        except BaseException:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+
+    def _load(self, path: Path, algorithm: Buhlmann, dive: Dive, sample_period: Time | None) -> DiveEvaluation:
+        with np.load(path, allow_pickle=False) as arrays:
+            ticks = arrays['ticks']
+            ambient_pressures = arrays['ambient_pressures']
+            timeline = dive.timeline if sample_period is None else Timeline.from_ticks(ticks.tolist(), named_times=dive.timeline.named_times)
+            pressure_gf_low = float(arrays['pressure_gf_low'])
+            compartiment_profiles = BMCompartimentProfiles.from_arrays(
+                table=algorithm.table, gf_low=algorithm.gf_low, gf_high=algorithm.gf_high, times=ticks/Time.ms_per_sec,
+                ambient_pressures=ambient_pressures, n2_pressures=arrays['n2_pressures'],
+                pressure_gf_low=None if np.isnan(pressure_gf_low) else pressure_gf_low,
+            )
+            return DiveEvaluation(
+                dive=dive, timeline=timeline, depths=arrays['depths'], ambient_pressures=ambient_pressures,
+                gas_supply_names=arrays['gas_supply_names'], sacs=arrays['sacs'],
+                cylinder_pressures={name: arrays[f'cylinder_pressures/{name}'] for name in dive.start_gas_supply_set.gas_supplies},
+                compartiment_profiles=compartiment_profiles,
+            )
+
+    def _evict(self):
+        entries = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
@@ -1,6 +1,10 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
 from functools import cached_property
 import math
-from typing import Iterator, Self
+from typing import Self
+
+import numpy as np
 
 from .quantity import Time
 
@@ -37,15 +41,36 @@ class Timeline:
             return self.times[index]
         else:
             times = self.times[index]
-            named_times = {time: name for time, name in self.named_times.items() if time in times}
+            indices = range(*index.indices(len(self)))
+            named_times = {time: name for time, name in self.named_times.items() if any(i in indices for i in self.indices(time))}
             return Timeline(times=times, named_times=named_times)
         
     def __iter__(self) -> Iterator[Time]:
         return iter(self.times)
     
     def __len__(self) -> int:
-        return len(self.times)
+        return len(self.ticks)
     
+    @staticmethod
+    def from_ticks(ticks: list[int], named_times: dict | None = None) -> Self:
+        # times are only created when accessed
+        timeline = Timeline.__new__(Timeline)
+        timeline.ticks = ticks
+        timeline.named_times = named_times if named_times is not None else {}
+        return timeline
+
+    @cached_property
+    def times(self) -> list[Time]:
+        return [Time.from_ms(tick) for tick in self.ticks]
+
+    @cached_property
+    def values(self) -> list[float]:
+        return [tick/Time.ms_per_sec for tick in self.ticks]
+
+    @cached_property
+    def ticks(self) -> list[int]:
+        return [time.ms for time in self.times]
+
     @cached_property
     def segments(self) -> list[TimeSegment]:
         return [TimeSegment(time0, time1) for time0, time1 in zip(self.times[:-1], self.times[1:])]
@@ -54,18 +79,29 @@ class Timeline:
     def named_profile(self) -> Self:
         return Timeline([time for time in self.times if time in self.named_times])
     
+    def index(self, time: Time) -> int:
+        indices = self.indices(time)
+        if not indices:
+            raise ValueError(f"{time} is not in timeline")
+        return indices[0]
+
+    def indices(self, time: Time) -> range:
+        return range(bisect_left(self.ticks, time.ms), bisect_right(self.ticks, time.ms))
+
     def segment_for(self, time: Time) -> TimeSegment:
-        for segment in self.segments:
-            if time in segment:
-                return segment
+        # first segment containing time, boundaries belong to the earlier segment
+        index = bisect_left(self.ticks, time.ms, lo=1) - 1
+        if 0 <= index < len(self.segments) and time in self.segments[index]:
+            return self.segments[index]
     
     def resample(self, sample_period: Time) -> Self:
-        times = [self[0]]
+        # whole sample periods between the existing times, computed per existing segment
+        period = sample_period.ms
+        ticks = [np.array(self.ticks[:1])]
         n = math.ceil(self[0]/sample_period) + 1
-        for existing_time in self[1:]:
-            while (time := n*sample_period) < existing_time:
-                times.append(time)
-                n += 1
-            times.append(existing_time)
-            n += 1
-        return Timeline(times, named_times=self.named_times)
+        for existing_tick in self.ticks[1:]:
+            count = max(0, -(-existing_tick//period) - n)
+            ticks.append(np.arange(n, n + count)*period)
+            ticks.append(np.array([existing_tick]))
+            n += count + 1
+        return Timeline.from_ticks(np.concatenate(ticks).tolist(), named_times=self.named_times)
@@ -0,0 +1,55 @@
+import pytest
+
+from src.buhlmann import zh_l16c
+from src.dive_plan import DivePlan
+from src.gas_profile import GasSupply, GasSupplySet
+from src.gear import Cylinder
+from src.physics import AIR, Gas
+from src.quantity import Pressure, Volume
+
+EAN50 = Gas(o2=0.5, he=0)
+
+TEC40 = [
+    ( 0,  0.0, 'main', 20),
+    ( 5,  1.0, 'main', 20),
+    ( 5,  5.0, 'main', 20),
+    (40,  3.0, 'main', 20),
+    (40, 13.0, 'main', 20),
+    (18,  2.5, 'deco', 20),
+    (18,  1.0, 'deco', 15),
+    ( 9,  1.0, 'deco', 15),
+    ( 9,  0.5, 'deco', 15),
+    ( 6,  0.5, 'deco', 15),
+    ( 6,  1.5, 'deco', 15),
+    ( 3,  0.5, 'deco', 15),
+    ( 3,  2.5, 'deco', 15),
+    ( 0,  0.5, 'deco', 15),
+]
+
+
+@pytest.fixture
+def gas_supply_set() -> GasSupplySet:
+    return GasSupplySet(
+        main=GasSupply(Cylinder(Volume(12e-3)), AIR, Pressure(200e5)),
+        deco=GasSupply(Cylinder(Volume(5.5e-3)), EAN50, Pressure(150e5)),
+    )
+
+
+@pytest.fixture
+def air_supply_set() -> GasSupplySet:
+    return GasSupplySet(main=GasSupply(Cylinder(Volume(12e-3)), AIR, Pressure(200e5)))
+
+
+@pytest.fixture
+def algorithm():
+    return zh_l16c(gf_low=0.35, gf_high=0.85)
+
+
+@pytest.fixture
+def tec40_plan(gas_supply_set) -> DivePlan:
+    return DivePlan.from_table(start_gas_supply_set=gas_supply_set, table=TEC40)
+
+
+@pytest.fixture
+def tec40_bottom_plan(gas_supply_set) -> DivePlan:
+    return DivePlan.from_table(start_gas_supply_set=gas_supply_set, table=TEC40[:5])
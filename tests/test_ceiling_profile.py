@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.buhlmann import zh_l16c
+from src.dive_plan import DivePlan
+from src.physics import P_ATM, depth_from_pressure
+from src.quantity import Pressure, Time
+
+
+def compartiment_profiles(algorithm, dive):
+    return algorithm.compartiment_profiles(dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set)
+
+
+def reference_ceilings(profiles, gf_low, gf_high):
+    # per compartiment and timestep through BMCompartiment.agf/bgf, gf_low deeper than pressure_gf_low
+    pressure_gf_low = profiles.pressure_gf_low
+    ceilings = np.empty(profiles.n2_pressures.shape)
+    for c, compartiment in enumerate(profiles.table.compartiments):
+        n2_pressures = profiles.n2_pressures[c]
+        low_ceilings = (n2_pressures - gf_low*compartiment.a.value)/(1 + gf_low/compartiment.b - gf_low)
+        agf = compartiment.agf(gf_low, gf_high, pressure_gf_low).value
+        bgf = compartiment.bgf(gf_low, gf_high, pressure_gf_low)
+        ceilings[c] = np.where(low_ceilings >= pressure_gf_low.value, low_ceilings, (n2_pressures - agf)*bgf)
+    return np.maximum(depth_from_pressure(Pressure(ceilings.max(axis=0))).value, 0)
+
+
+def test_ceiling_profile_matches_compartiment_coefficients(tec40_plan):
+    algorithm = zh_l16c(0.35, 0.85, exact=True)
+    profiles = compartiment_profiles(algorithm, tec40_plan.dive.resample(Time(10)))
+    assert profiles.pressure_gf_low is not None
+    ceiling = profiles.ceiling_profile()
+    np.testing.assert_allclose(ceiling.depths, reference_ceilings(profiles, 0.35, 0.85), atol=1e-9)
+    assert ceiling.depths.max() > 0
+    deep = profiles.ambient_pressures >= profiles.pressure_gf_low.value
+    np.testing.assert_array_equal(ceiling.gradient_factors[deep], 0.35)
+
+
+@pytest.mark.parametrize('sample_period', [None, Time(10)])
+def test_no_stop_dive_exceeding_gf_low_on_surfacing(gas_supply_set, sample_period):
+    # a plain 12 m / 40 min air dive only exceeds gf_low 0.3 at the final surface sample
+    plan = DivePlan.from_table(gas_supply_set, [(0, 0, 'main', 20), (12, 1, 'main', 20), (12, 40, 'main', 20), (0, 1, 'main', 20)])
+    dive = plan.dive if sample_period is None else plan.dive.resample(sample_period)
+    profiles = compartiment_profiles(zh_l16c(0.3, 0.8, exact=True), dive)
+    ceiling = profiles.ceiling_profile()
+    assert np.all(np.isfinite(ceiling.depths))
+    assert ceiling.depths.max() == 0
+    surface_ceiling = profiles.ceiling_profile(pressure_gf_low=P_ATM)
+    np.testing.assert_array_equal(surface_ceiling.depths, ceiling.depths)
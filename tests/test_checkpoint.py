@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.buhlmann import BMTissueCheckpoint, zh_l16c
+from src.dive_evaluation import DiveEvaluation
+from src.dive_series import DiveSeries
+from src.quantity import Time
+
+
+def test_checkpoint_round_trips_through_bytes():
+    checkpoint = BMTissueCheckpoint(ambient_pressure=123456.0, n2_pressures=np.linspace(7e4, 9e4, 16))
+    restored = BMTissueCheckpoint.from_bytes(checkpoint.to_bytes())
+    assert restored.ambient_pressure == checkpoint.ambient_pressure
+    np.testing.assert_array_equal(restored.n2_pressures, checkpoint.n2_pressures)
+
+
+def test_start_n2_pressure_is_per_compartiment(algorithm, tec40_plan):
+    dive = tec40_plan.dive
+    exact = zh_l16c(algorithm.gf_low, algorithm.gf_high, exact=True)
+    first = exact.compartiment_profiles(dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set)
+    checkpoint = exact.surface_interval(first.checkpoint(), Time(min=60))
+    assert isinstance(checkpoint.start_n2_pressure, np.ndarray)
+    assert checkpoint.start_n2_pressure.shape == (len(exact.table),)
+    from_checkpoint = exact.compartiment_profiles(dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set, start_checkpoint=checkpoint)
+    from_pressures = exact.compartiment_profiles(
+        dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set,
+        start_ambient_pressure=checkpoint.start_ambient_pressure, start_n2_pressure=checkpoint.start_n2_pressure,
+    )
+    np.testing.assert_array_equal(from_checkpoint.n2_pressures, from_pressures.n2_pressures)
+    np.testing.assert_array_equal(from_checkpoint.n2_pressures[:, 0], checkpoint.n2_pressures)
+    evaluation = DiveEvaluation.create(exact, dive, start_checkpoint=checkpoint)
+    np.testing.assert_allclose(evaluation.n2_pressures, from_checkpoint.n2_pressures, rtol=1e-12)
+    # the slowest compartiment still carries nitrogen from the first dive
+    assert from_checkpoint.n2_pressures[-1, -1] > first.n2_pressures[-1, -1]
+
+
+def test_repetitive_dive_needs_more_deco(algorithm, tec40_plan, tec40_bottom_plan):
+    series = DiveSeries(zh_l16c(algorithm.gf_low, algorithm.gf_high, exact=True))
+    series.append(tec40_plan)
+    repetitive = series.schedule(tec40_bottom_plan, surface_interval=Time(min=60))
+    fresh = algorithm.schedule(tec40_bottom_plan)
+    assert repetitive.deco_time.value > fresh.deco_time.value
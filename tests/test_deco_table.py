@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.buhlmann import zh_l16c
+from src.deco_table import DecoTable
+from src.dive_plan import DivePlan
+
+DESCENT_RATE_MMIN = 18
+
+
+def direct_schedule(algorithm, gas_supply_set, depth_m, bottom_time_min):
+    # the same dive scheduled from scratch, bottom times include the descent
+    descent_min = depth_m/DESCENT_RATE_MMIN
+    return algorithm.schedule(DivePlan.from_table(gas_supply_set, [
+        (0, 0, 'main', 20), (depth_m, descent_min, 'main', 20), (depth_m, bottom_time_min - descent_min, 'main', 20),
+    ]))
+
+
+@pytest.mark.parametrize('depth_m', [9.6, 12, 18, 30])
+def test_ndl_matches_direct_schedules(air_supply_set, depth_m):
+    # at 9.6 m the NDL lies between the last doubling probe (256 min) and max_ndl_min
+    algorithm = zh_l16c(0.3, 0.8)
+    table = DecoTable.create(algorithm, air_supply_set, [depth_m], [20], descent_rate_mmin=DESCENT_RATE_MMIN, processes=1)
+    ndl = table.ndls[0, 0]
+    assert np.isfinite(ndl)
+    assert direct_schedule(algorithm, air_supply_set, depth_m, ndl).stops == []
+    assert direct_schedule(algorithm, air_supply_set, depth_m, ndl + 1).stops != []
+
+
+def test_ndl_is_unlimited_only_without_stops_at_max_ndl(air_supply_set):
+    algorithm = zh_l16c(0.3, 0.8)
+    table = DecoTable.create(algorithm, air_supply_set, [6, 9.6], [20], max_ndl_min=300, processes=1)
+    assert table.ndls[0, 0] == np.inf
+    assert direct_schedule(algorithm, air_supply_set, 6, 300).stops == []
+    assert table.ndls[0, 1] < 300
+
+
+def test_cells_match_direct_schedules(air_supply_set):
+    algorithm = zh_l16c(0.3, 0.8)
+    depths_m = [21, 30]
+    bottom_times_min = [10, 25, 40]
+    table = DecoTable.create(algorithm, air_supply_set, depths_m, bottom_times_min, processes=1)
+    for i, depth_m in enumerate(depths_m):
+        for j, bottom_time_min in enumerate(bottom_times_min):
+            schedule = direct_schedule(algorithm, air_supply_set, depth_m, bottom_time_min)
+            assert table.deco_times[0, i, j] == schedule.deco_time.value
+            first_stop = schedule.first_stop.value if schedule.first_stop is not None else np.nan
+            np.testing.assert_equal(table.first_stops[0, i, j], first_stop)
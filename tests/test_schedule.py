@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from src.buhlmann import Buhlmann, zh_l16c
+from src.dive_plan import DivePlan
+
+
+def test_tec40_schedule(algorithm, tec40_bottom_plan):
+    schedule = algorithm.schedule(tec40_bottom_plan)
+    assert [(depth.value, duration.value) for depth, duration in schedule.stops] == [(21, 60), (9, 60), (6, 60), (3, 120)]
+    assert schedule.first_stop.value == 9
+    assert schedule.pressure_gf_low is not None
+    assert schedule.deco_time.value == 300
+    assert schedule.dive_plan.rows[-1].depth.value == 0
+
+
+def test_first_stop_is_a_stop_made(algorithm, tec40_bottom_plan):
+    for gf_low in (0.1, 0.3, 0.5, 0.7, 0.9):
+        schedule = Buhlmann(algorithm.compartiments, gf_low=gf_low, gf_high=0.85).schedule(tec40_bottom_plan)
+        assert schedule.first_stop in [depth for depth, _ in schedule.stops]
+
+
+def test_schedule_keeps_the_ceiling_above_the_diver(algorithm, tec40_bottom_plan):
+    schedule = algorithm.schedule(tec40_bottom_plan)
+    dive = schedule.dive_plan.dive
+    profiles = zh_l16c(algorithm.gf_low, algorithm.gf_high, exact=True).compartiment_profiles(
+        dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set,
+    )
+    ceiling = profiles.ceiling_profile(pressure_gf_low=schedule.pressure_gf_low)
+    ascent = slice(len(tec40_bottom_plan.rows), None)
+    assert np.all(ceiling.depths[ascent] <= dive.depth_profile.values[ascent] + 1e-9)
+
+
+def test_schedule_without_deco(air_supply_set, gas_supply_set, algorithm):
+    plan = DivePlan.from_table(air_supply_set, [(0, 0, 'main', 20), (12, 1, 'main', 20), (12, 20, 'main', 20)])
+    schedule = algorithm.schedule(plan)
+    assert schedule.first_stop is None
+    assert schedule.stops == []
+    # a gas switch stop is not a deco stop
+    schedule = algorithm.schedule(DivePlan(gas_supply_set, plan.rows))
+    assert [depth.value for depth, _ in schedule.stops] == [9]
+    assert schedule.first_stop is None
+
+
+def test_stop_longer_than_1024_steps(air_supply_set, algorithm):
+    plan = DivePlan.from_table(air_supply_set, [(0, 0, 'main', 20), (30, 2, 'main', 20), (30, 42, 'main', 20)])
+    schedule = algorithm.schedule(plan, stop_step_min=1/60)
+    depth, duration = schedule.stops[-1]
+    assert depth.value == 3
+    assert 1024 < duration.value <= 24*60
+
+
+@pytest.mark.parametrize('min_steps', [0, 1, 3])
+@pytest.mark.parametrize('needed_steps', [0, 1, 2, 5, 64, 1000, 1024, 1025, 1300, 1439, 1440])
+def test_bisect_steps_finds_the_fewest_clearing_steps(min_steps, needed_steps):
+    probes = []
+
+    def clears(steps: int) -> bool:
+        probes.append(steps)
+        return steps >= needed_steps
+
+    assert Buhlmann._bisect_steps(clears, min_steps, max_steps=1440) == max(min_steps, needed_steps)
+    assert max(probes) <= 1440
+
+
+def test_bisect_steps_raises_beyond_max_steps():
+    with pytest.raises(ValueError):
+        Buhlmann._bisect_steps(lambda steps: steps >= 1441, 0, max_steps=1440)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from src.buhlmann import SCAN_BLOCK_DECAY, BMCompartimentState, zh_l16c
+from src.dive_plan import DivePlan
+from src.physics import AIR, P_ATM, pressure_from_depth
+from src.quantity import Depth, Pressure, Time
+
+
+def reference_n2_pressures(algorithm, dive, exact):
+    # the per-compartiment state loop the NumPy engine replaced
+    gas_supply_names, _ = dive.gas_usage_profile.segment_arrays(dive.timeline)
+    gas_supplies = dive.start_gas_supply_set.gas_supplies
+    ambient_pressures = pressure_from_depth(Depth(dive.depth_profile.values)).value.copy()
+    ambient_pressures[0] = P_ATM.value
+    times = dive.timeline.times
+    n2_pressures = np.empty((len(algorithm.compartiments), len(times)))
+    for c, compartiment in enumerate(algorithm.compartiments):
+        state = BMCompartimentState(compartiment, P_ATM, AIR.ppn2(P_ATM))
+        n2_pressures[c, 0] = state.n2_pressure.value
+        for i in range(1, len(times)):
+            gas = gas_supplies[str(gas_supply_names[i - 1])].gas
+            state = state.next(times[i] - times[i - 1], Pressure(ambient_pressures[i]), gas, exact=exact)
+            n2_pressures[c, i] = state.n2_pressure.value
+    return n2_pressures
+
+
+def compartiment_profiles(algorithm, dive):
+    return algorithm.compartiment_profiles(dive.depth_profile, dive.gas_usage_profile, dive.start_gas_supply_set)
+
+
+def test_haldane_load_matches_compartiment_loop(tec40_plan):
+    algorithm = zh_l16c(0.35, 0.85)
+    dive = tec40_plan.dive.resample(Time(10))
+    profiles = compartiment_profiles(algorithm, dive)
+    np.testing.assert_allclose(profiles.n2_pressures, reference_n2_pressures(algorithm, dive, exact=False), rtol=1e-9)
+
+
+def test_schreiner_load_matches_compartiment_loop(tec40_plan):
+    algorithm = zh_l16c(0.35, 0.85, exact=True)
+    dive = tec40_plan.dive
+    profiles = compartiment_profiles(algorithm, dive)
+    np.testing.assert_allclose(profiles.n2_pressures, reference_n2_pressures(algorithm, dive, exact=True), rtol=1e-9)
+
+
+def test_schreiner_load_converges_to_fine_haldane_steps(tec40_plan):
+    dive = tec40_plan.dive
+    exact = compartiment_profiles(zh_l16c(0.35, 0.85, exact=True), dive).n2_pressures[:, -1]
+    fine = compartiment_profiles(zh_l16c(0.35, 0.85), dive.resample(Time(1))).n2_pressures[:, -1]
+    np.testing.assert_allclose(fine, exact, rtol=1e-3)
+
+
+def test_scan_spans_many_blocks(gas_supply_set):
+    # long segments make the fastest compartiment decay past SCAN_BLOCK_DECAY several times over
+    table = [(0, 0, 'main', 20)] + [(depth, 30, 'main', 20) for depth in (10, 30, 5, 40, 0, 20)]*4
+    dive = DivePlan.from_table(gas_supply_set, table).dive
+    algorithm = zh_l16c(0.35, 0.85, exact=True)
+    durations = np.diff(dive.timeline.values)
+    assert np.sum(algorithm.table.k.max()*durations) > 4*SCAN_BLOCK_DECAY
+    profiles = compartiment_profiles(algorithm, dive)
+    np.testing.assert_allclose(profiles.n2_pressures, reference_n2_pressures(algorithm, dive, exact=True), rtol=1e-9)
+
+
+def test_batch_matches_single_dives(gas_supply_set):
+    algorithm = zh_l16c(0.35, 0.85)
+    dives = [
+        DivePlan.from_table(gas_supply_set, [(0, 0, 'main', 20), (depth, 2, 'main', 20), (depth, bottom_time, 'main', 20), (0, 4, 'deco', 15)]).dive.resample(Time(10))
+            for depth, bottom_time in [(12, 40), (30, 15), (45, 8), (20, 25), (6, 60)]
+    ]
+    batch = algorithm.batch_compartiment_profiles(dives, batch_size=2)
+    for dive, profiles in zip(dives, batch):
+        single = compartiment_profiles(algorithm, dive)
+        np.testing.assert_allclose(profiles.n2_pressures, single.n2_pressures, rtol=1e-12)
+        assert (profiles.pressure_gf_low is None) == (single.pressure_gf_low is None)
+        if single.pressure_gf_low is not None:
+            assert profiles.pressure_gf_low.value == pytest.approx(single.pressure_gf_low.value)
+
+
+def test_single_sample_timeline_keeps_start_state(gas_supply_set):
+    algorithm = zh_l16c(0.35, 0.85)
+    dive = DivePlan.from_table(gas_supply_set, [(0, 0, 'main', 20)]).dive
+    profiles = compartiment_profiles(algorithm, dive)
+    assert profiles.n2_pressures.shape == (len(algorithm.compartiments), 1)
+    np.testing.assert_allclose(profiles.n2_pressures[:, 0], AIR.ppn2(P_ATM).value)
+
+
+def test_pressure_gf_low_is_the_deepest_exceeding_sample(tec40_plan):
+    algorithm = zh_l16c(0.35, 0.85)
+    dive = tec40_plan.dive.resample(Time(10))
+    profiles = compartiment_profiles(algorithm, dive)
+    tolerated_pressures = algorithm.table.tolerated_pressures(profiles.ambient_pressures[:, np.newaxis], 0.35).T
+    exceeded = (profiles.n2_pressures > tolerated_pressures).any(axis=0) & (profiles.ambient_pressures > P_ATM.value)
+    assert profiles.pressure_gf_low.value == profiles.ambient_pressures[exceeded].max()
+
+
+def test_pressure_gf_low_leaves_out_surface_samples(gas_supply_set):
+    # a plain 12 m / 40 min air dive only exceeds gf_low 0.3 at the final surface sample
+    plan = DivePlan.from_table(gas_supply_set, [(0, 0, 'main', 20), (12, 1, 'main', 20), (12, 40, 'main', 20), (0, 1, 'main', 20)])
+    algorithm = zh_l16c(0.3, 0.8)
+    dive = plan.dive.resample(Time(10))
+    profiles = compartiment_profiles(algorithm, dive)
+    tolerated_pressures = algorithm.table.tolerated_pressures(profiles.ambient_pressures[-1], 0.3)
+    assert np.any(profiles.n2_pressures[:, -1] > tolerated_pressures)
+    assert profiles.pressure_gf_low is None
+    assert algorithm.batch_compartiment_profiles([dive])[0].pressure_gf_low is None
+    stream = algorithm.tissue_stream()
+    stream.feed(np.diff(dive.timeline.values), profiles.ambient_pressures[1:], np.full(len(dive.timeline) - 1, AIR.n2))
+    assert stream.pressure_gf_low is None